@@ -8,6 +8,8 @@ from sqlalchemy.ext.asyncio import async_engine_from_config
 from alembic import context
 from app.config import settings
 from app.models.channel import Channel
+from app.models.group_channel import GroupChannel  # noqa: F401  (registers the table)
+from app.models.subscription import Subscription  # noqa: F401
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -0,0 +1,36 @@
+"""group channels
+
+Revision ID: 3f9c2d7a8b41
+Revises: ba051ae155a4
+Create Date: 2026-10-18 09:12:40.318254
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f9c2d7a8b41'
+down_revision: Union[str, None] = 'ba051ae155a4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('group_channels',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('group_id', sa.BigInteger(), nullable=False),
+    sa.Column('channel_id', sa.BigInteger(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['channel_id'], ['channels.telegram_id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('group_id', 'channel_id')
+    )
+    op.create_index(op.f('ix_group_channels_channel_id'), 'group_channels', ['channel_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_group_channels_channel_id'), table_name='group_channels')
+    op.drop_table('group_channels')
@@ -0,0 +1,34 @@
+"""subscriptions
+
+Revision ID: 8d1e5b60c2f7
+Revises: 3f9c2d7a8b41
+Create Date: 2026-10-18 10:41:07.529113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d1e5b60c2f7'
+down_revision: Union[str, None] = '3f9c2d7a8b41'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('subscriptions',
+    sa.Column('user_id', sa.BigInteger(), nullable=False),
+    sa.Column('channel_id', sa.BigInteger(), nullable=False),
+    sa.Column('is_subscribed', sa.Boolean(), nullable=False),
+    sa.Column('verified_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('user_id', 'channel_id')
+    )
+    op.create_index(op.f('ix_subscriptions_verified_at'), 'subscriptions', ['verified_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_subscriptions_verified_at'), table_name='subscriptions')
+    op.drop_table('subscriptions')
@@ -0,0 +1,34 @@
+"""configured groups
+
+Revision ID: c4e7a2f91d36
+Revises: 8d1e5b60c2f7
+Create Date: 2026-10-18 14:03:22.814706
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e7a2f91d36'
+down_revision: Union[str, None] = '8d1e5b60c2f7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('configured_groups',
+    sa.Column('group_id', sa.BigInteger(), autoincrement=False, nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('group_id')
+    )
+    op.execute(
+        "INSERT INTO configured_groups (group_id, created_at) "
+        "SELECT group_id, MIN(created_at) FROM group_channels GROUP BY group_id"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('configured_groups')
@@ -2,10 +2,10 @@ from collections.abc import Sequence
 
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 
-from app.models.channel import Channel
+from app.services.channel_registry import ChannelRecord
 
 
-def get_subscription_keyboard(channels: Sequence[Channel]) -> InlineKeyboardMarkup:
+def get_subscription_keyboard(channels: Sequence[ChannelRecord]) -> InlineKeyboardMarkup:
     buttons = []
     for channel in channels:
         url = (
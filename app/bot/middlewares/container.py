@@ -5,6 +5,7 @@ from aiogram import BaseMiddleware
 from aiogram.types import TelegramObject
 
 from app.container import Container
+from app.storage.session import LazySession
 
 
 class ContainerMiddleware(BaseMiddleware):
@@ -19,7 +20,20 @@ class ContainerMiddleware(BaseMiddleware):
     ) -> Any:
         data["redis"] = self.container.redis
         data["bot"] = self.container.bot
+        data["channel_registry"] = self.container.channel_registry
+        data["deletion_scheduler"] = self.container.deletion_scheduler
+        data["flood_limiter"] = self.container.flood_limiter
+        data["group_admins"] = self.container.group_admins
+        data["subscription_cache"] = self.container.subscription_cache
+        data["subscription_service"] = self.container.subscription_service
+        data["tracer"] = self.container.tracer
+        data["update_scheduler"] = self.container.update_scheduler
+        data["warning_debouncer"] = self.container.warning_debouncer
 
-        async with self.container.session() as session:
-            data["session"] = session
+        # handlers get a lazy handle: no session (and no pool checkout) unless used
+        session = LazySession(self.container.session_factory)
+        data["session"] = session
+        try:
             return await handler(event, data)
+        finally:
+            await session.close()
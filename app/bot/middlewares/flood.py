@@ -0,0 +1,64 @@
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from aiogram import BaseMiddleware
+from aiogram.enums import ChatType
+from aiogram.types import Message, TelegramObject
+from structlog import get_logger
+
+from app import metrics, tracing
+from app.services.admins import GroupAdminCache
+from app.services.flood import FloodLimiter
+
+logger = get_logger()
+
+
+class FloodMiddleware(BaseMiddleware):
+    """
+    Deletes messages over the per-user flood limit before the subscription check.
+
+    A flooding user costs one deleteMessage per message and no membership
+    lookups. Must be registered before SubscriptionMiddleware.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        if not isinstance(event, Message) or event.chat.type == ChatType.PRIVATE:
+            return await handler(event, data)
+
+        user = event.from_user
+        if not user or user.is_bot:
+            return await handler(event, data)
+
+        # only groups the bot enforces subscriptions in
+        if not data["channel_registry"].channels_for(event.chat.id):
+            return await handler(event, data)
+
+        limiter: FloodLimiter = data["flood_limiter"]
+        if limiter.is_blocked(event.chat.id, user.id):
+            source = "local"
+        else:
+            try:
+                with tracing.span("stage.flood_check"):
+                    allowed = await limiter.hit(event.chat.id, user.id, event.message_id)
+            except Exception as e:
+                # the limiter is a safeguard, never block messages because of it
+                logger.warning("Failed to check flood limit", error=str(e))
+                allowed = True
+            if allowed:
+                return await handler(event, data)
+            source = "redis"
+
+        group_admins: GroupAdminCache = data["group_admins"]
+        if await group_admins.is_admin(event.chat.id, user.id):
+            return await handler(event, data)
+
+        metrics.FLOOD_LIMITED.labels(source).inc()
+        try:
+            await event.delete()
+        except Exception as e:
+            logger.warning("Failed to delete flood message", error=str(e))
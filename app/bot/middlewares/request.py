@@ -1,23 +1,52 @@
 import asyncio
+import heapq
+import itertools
+import random
+import time
 from collections.abc import Callable
+from enum import IntEnum
 from typing import Any
 
 from aiogram import Bot
 from aiogram.client.session.middlewares.base import BaseRequestMiddleware
-from aiogram.exceptions import TelegramNetworkError
-from aiogram.methods import TelegramMethod
+from aiogram.exceptions import (
+    TelegramAPIError,
+    TelegramNetworkError,
+    TelegramRetryAfter,
+    TelegramServerError,
+)
+from aiogram.methods import (
+    DeleteMessage,
+    DeleteMessages,
+    EditMessageReplyMarkup,
+    EditMessageText,
+    GetChat,
+    GetChatAdministrators,
+    GetChatMember,
+    GetMe,
+    GetUpdates,
+    SendMessage,
+    TelegramMethod,
+)
 from aiogram.methods.base import TelegramType
 from structlog import get_logger
 
+from app import metrics, tracing
+from app.services.circuit import CircuitBreaker
+
 logger = get_logger()
 
 
 class RetryRequestMiddleware(BaseRequestMiddleware):
-    """Retry requests on TelegramNetworkError"""
+    """
+    Retry requests on network/server errors and 429 responses.
+    Uses exponential backoff with full jitter; 429 waits for `retry_after`.
+    """
 
-    def __init__(self, max_retries: int = 3, sleep_time: float = 1.0):
+    def __init__(self, max_retries: int = 3, sleep_time: float = 1.0, max_sleep: float = 30.0):
         self.max_retries = max_retries
         self.sleep_time = sleep_time
+        self.max_sleep = max_sleep
 
     async def __call__(
         self,
@@ -29,16 +58,310 @@ class RetryRequestMiddleware(BaseRequestMiddleware):
         for attempt in range(1, self.max_retries + 1):
             try:
                 return await make_request(bot, method)
-            except TelegramNetworkError as e:
+            except (TelegramNetworkError, TelegramServerError, TelegramRetryAfter) as e:
                 # If last attempt, raise
                 if attempt == self.max_retries:
                     raise e
 
+                if isinstance(e, TelegramRetryAfter):
+                    delay = float(e.retry_after)
+                else:
+                    backoff = min(self.max_sleep, self.sleep_time * 2 ** (attempt - 1))
+                    delay = random.uniform(0, backoff)
+
+                metrics.BOT_API_RETRIES.labels(
+                    method.__class__.__name__, e.__class__.__name__
+                ).inc()
                 logger.warning(
                     "Request failed, retrying",
                     method=method.__class__.__name__,
                     attempt=attempt,
                     max_retries=self.max_retries,
+                    delay=round(delay, 3),
                     error=str(e),
                 )
-                await asyncio.sleep(self.sleep_time)
+                await asyncio.sleep(delay)
+
+
+class MetricsRequestMiddleware(BaseRequestMiddleware):
+    """
+    Counts Bot API requests and measures their latency per method.
+
+    Registered last, so it sees every attempt separately and does not count time
+    spent waiting for the rate limiter or between retries.
+    """
+
+    async def __call__(
+        self,
+        make_request: Callable[[Bot, TelegramMethod[TelegramType]], Any],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Any:
+        name = method.__class__.__name__
+        started = time.perf_counter()
+        outcome = "ok"
+        try:
+            return await make_request(bot, method)
+        except Exception as e:
+            outcome = e.__class__.__name__
+            raise
+        finally:
+            metrics.BOT_API_REQUEST_SECONDS.labels(name).observe(time.perf_counter() - started)
+            metrics.BOT_API_REQUESTS.labels(name, outcome).inc()
+
+
+class BreakerRequestMiddleware(BaseRequestMiddleware):
+    """
+    Feeds a circuit breaker with the outcome and latency of each API attempt.
+
+    Registered after the rate limiter, so time spent in our own buckets never
+    counts as a slow API. Network and server errors are failures; any other
+    answer, an error response included, means the API is healthy.
+    """
+
+    def __init__(self, breaker: CircuitBreaker, methods: tuple[type[TelegramMethod[Any]], ...]):
+        self._breaker = breaker
+        self._methods = methods
+
+    async def __call__(
+        self,
+        make_request: Callable[[Bot, TelegramMethod[TelegramType]], Any],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Any:
+        if not isinstance(method, self._methods):
+            return await make_request(bot, method)
+
+        started = time.monotonic()
+        try:
+            result = await make_request(bot, method)
+        except asyncio.CancelledError:
+            # shutdown or the caller's timeout: only an attempt that was already
+            # slow says something about the API
+            duration = time.monotonic() - started
+            if duration >= self._breaker.slow_call_duration:
+                self._breaker.record(True, duration)
+            raise
+        except (TelegramNetworkError, TelegramServerError):
+            self._breaker.record(False, time.monotonic() - started)
+            raise
+        except TelegramAPIError:
+            self._breaker.record(True, time.monotonic() - started)
+            raise
+        except Exception:
+            self._breaker.record(False, time.monotonic() - started)
+            raise
+        self._breaker.record(True, time.monotonic() - started)
+        return result
+
+
+class TracingRequestMiddleware(BaseRequestMiddleware):
+    """
+    Records each Bot API call as a span of the current update.
+
+    Registered first, so the span covers what the update waits for: rate
+    limiting, retries and backoff included.
+    """
+
+    async def __call__(
+        self,
+        make_request: Callable[[Bot, TelegramMethod[TelegramType]], Any],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Any:
+        with tracing.span(f"api.{method.__class__.__name__}"):
+            return await make_request(bot, method)
+
+
+class Priority(IntEnum):
+    """Scheduling lanes, lower value goes first."""
+
+    HIGH = 0  # deletes and membership checks
+    NORMAL = 1
+    LOW = 2  # warnings and other outgoing messages
+
+
+METHOD_PRIORITIES: dict[type[TelegramMethod[Any]], Priority] = {
+    DeleteMessage: Priority.HIGH,
+    DeleteMessages: Priority.HIGH,
+    GetChatMember: Priority.HIGH,
+    GetChatAdministrators: Priority.HIGH,
+    SendMessage: Priority.LOW,
+    EditMessageText: Priority.LOW,
+    EditMessageReplyMarkup: Priority.LOW,
+}
+SEND_METHODS = (SendMessage, EditMessageText, EditMessageReplyMarkup)
+DELETE_METHODS = (DeleteMessage, DeleteMessages)
+# reads are not covered by Telegram's global limit and get a budget of their own
+READ_METHODS = (GetChatMember, GetChatAdministrators, GetChat, GetMe)
+
+
+class TokenBucket:
+    """
+    Token bucket with prioritized waiters.
+
+    Requests take a token immediately while tokens are available and nobody is
+    queued; otherwise they wait in a heap ordered by (priority, arrival), so
+    high-priority lanes overtake queued low-priority requests.
+    """
+
+    __slots__ = (
+        "rate",
+        "capacity",
+        "_tokens",
+        "_updated",
+        "_paused_until",
+        "_waiters",
+        "_seq",
+        "_drainer",
+    )
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._waiters: list[tuple[int, int, asyncio.Future[None]]] = []
+        self._seq = itertools.count()
+        self._drainer: asyncio.Task[None] | None = None
+
+    @property
+    def idle(self) -> bool:
+        self._refill()
+        return not self._waiters and self._tokens >= self.capacity
+
+    async def acquire(self, priority: int = Priority.NORMAL) -> None:
+        self._refill()
+        if not self._waiters and self._tokens >= 1 and time.monotonic() >= self._paused_until:
+            self._tokens -= 1
+            return
+
+        future: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), future))
+        if self._drainer is None:
+            self._drainer = asyncio.create_task(self._drain())
+        await future
+
+    def pause(self, seconds: float) -> None:
+        """Stop handing out tokens, e.g. after a 429 with retry_after."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._tokens = 0
+        # refill from empty once the pause is over, not for the time paused
+        self._updated = self._paused_until
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        if now <= self._updated:
+            return
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def _drain(self) -> None:
+        try:
+            while self._waiters:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+
+                self._refill()
+                if self._tokens < 1:
+                    await asyncio.sleep((1 - self._tokens) / self.rate)
+                    continue
+
+                _, _, future = heapq.heappop(self._waiters)
+                if future.done():  # waiter was cancelled
+                    continue
+                self._tokens -= 1
+                future.set_result(None)
+        finally:
+            self._drainer = None
+
+
+class RateLimitRequestMiddleware(BaseRequestMiddleware):
+    """
+    Schedules outgoing requests so the bot stays under Telegram limits.
+
+    Reads (membership and admin lookups) pass a bucket of their own, limited to
+    `read_rate` (0: unlimited); every other request passes the global bucket, and
+    sends and deletes also pass a bucket of their chat. Waiting requests are
+    served by priority lane, and a 429 pauses the bucket it was hit on for
+    `retry_after`, so the backlog drains smoothly instead of hammering the API.
+    """
+
+    MAX_CHAT_BUCKETS = 10_000
+
+    def __init__(
+        self,
+        global_rate: float = 30.0,
+        chat_send_rate: float = 20 / 60,
+        chat_send_burst: float = 3,
+        chat_delete_rate: float = 20.0,
+        chat_delete_burst: float = 20,
+        read_rate: float = 0.0,
+    ):
+        self._global = TokenBucket(global_rate, global_rate)
+        self._reads = TokenBucket(read_rate, read_rate) if read_rate > 0 else None
+        self._chat_send_rate = chat_send_rate
+        self._chat_send_burst = chat_send_burst
+        self._chat_delete_rate = chat_delete_rate
+        self._chat_delete_burst = chat_delete_burst
+        self._chat_buckets: dict[tuple[str, int | str], TokenBucket] = {}
+
+    async def __call__(
+        self,
+        make_request: Callable[[Bot, TelegramMethod[TelegramType]], Any],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Any:
+        if isinstance(method, GetUpdates):
+            # long polling must never wait behind outgoing traffic
+            return await make_request(bot, method)
+
+        priority = METHOD_PRIORITIES.get(type(method), Priority.NORMAL)
+        if isinstance(method, READ_METHODS):
+            chat_bucket, shared_bucket = None, self._reads
+        else:
+            chat_bucket, shared_bucket = self._chat_bucket(method), self._global
+        if chat_bucket is not None:
+            await chat_bucket.acquire(priority)
+        if shared_bucket is not None:
+            await shared_bucket.acquire(priority)
+
+        try:
+            return await make_request(bot, method)
+        except TelegramRetryAfter as e:
+            bucket = chat_bucket or shared_bucket
+            if bucket is not None:
+                bucket.pause(e.retry_after)
+            logger.warning(
+                "Rate limited by Telegram",
+                method=method.__class__.__name__,
+                retry_after=e.retry_after,
+            )
+            raise
+
+    def _chat_bucket(self, method: TelegramMethod[Any]) -> TokenBucket | None:
+        if isinstance(method, SEND_METHODS):
+            kind, rate, burst = "send", self._chat_send_rate, self._chat_send_burst
+        elif isinstance(method, DELETE_METHODS):
+            kind, rate, burst = "delete", self._chat_delete_rate, self._chat_delete_burst
+        else:
+            return None
+
+        chat_id = getattr(method, "chat_id", None)
+        if chat_id is None:
+            return None
+
+        key = (kind, chat_id)
+        bucket = self._chat_buckets.get(key)
+        if bucket is None:
+            if len(self._chat_buckets) >= self.MAX_CHAT_BUCKETS:
+                self._evict_idle()
+            bucket = self._chat_buckets[key] = TokenBucket(rate, burst)
+        return bucket
+
+    def _evict_idle(self) -> None:
+        for key in [key for key, bucket in self._chat_buckets.items() if bucket.idle]:
+            del self._chat_buckets[key]
@@ -0,0 +1,114 @@
+import asyncio
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from aiogram import BaseMiddleware
+from aiogram.types import Chat, TelegramObject, Update, User
+from structlog import get_logger
+
+logger = get_logger()
+
+_Item = tuple[
+    Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+    TelegramObject,
+    dict[str, Any],
+    float,
+]
+
+
+class UpdateScheduler(BaseMiddleware):
+    """
+    Bounded worker pool between the dispatcher and the routers.
+
+    Updates are sharded by chat id into one bounded queue per worker, so updates of
+    a chat are processed strictly in order while different chats run in parallel.
+    When a shard is full, enqueueing blocks: with `handle_as_tasks=False` polling
+    (or a synchronous webhook handler) this pushes back on update ingestion instead
+    of spawning unbounded tasks.
+
+    Must be registered as an outer update middleware before anything that holds
+    resources per update (e.g. ContainerMiddleware), since the rest of the chain
+    runs later on a worker.
+    """
+
+    def __init__(self, workers: int = 32, queue_size: int = 100) -> None:
+        self._queues: list[asyncio.Queue[_Item]] = [
+            asyncio.Queue(maxsize=queue_size) for _ in range(workers)
+        ]
+        self._workers: list[asyncio.Task[None]] = []
+        self._lag = 0.0
+        self._max_lag = 0.0
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        if not self._workers:
+            # not started (e.g. during shutdown): process inline
+            return await handler(event, data)
+
+        shard = self._shard_key(event, data) % len(self._queues)
+        await self._queues[shard].put((handler, event, data, time.monotonic()))
+        return None
+
+    def start(self) -> None:
+        if not self._workers:
+            self._workers = [asyncio.create_task(self._work(queue)) for queue in self._queues]
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Processes what is already queued (up to `timeout`), then stops the workers."""
+        if not self._workers:
+            return
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*(queue.join() for queue in self._queues)), timeout
+            )
+        except TimeoutError:
+            logger.warning("Update queues not drained before shutdown", queued=self.depth)
+
+        workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+    @property
+    def depth(self) -> int:
+        return sum(queue.qsize() for queue in self._queues)
+
+    def stats(self) -> dict[str, Any]:
+        """Queue depth and queueing lag (seconds) for monitoring."""
+        return {
+            "workers": len(self._queues),
+            "queued": self.depth,
+            "busiest_queue": max(queue.qsize() for queue in self._queues),
+            "lag": round(self._lag, 3),
+            "max_lag": round(self._max_lag, 3),
+        }
+
+    async def _work(self, queue: asyncio.Queue[_Item]) -> None:
+        while True:
+            handler, event, data, enqueued_at = await queue.get()
+            lag = time.monotonic() - enqueued_at
+            # exponentially weighted, so a single slow update does not dominate
+            self._lag = self._lag * 0.9 + lag * 0.1
+            self._max_lag = max(self._max_lag, lag)
+            try:
+                await handler(event, data)
+            except Exception:
+                update_id = event.update_id if isinstance(event, Update) else None
+                logger.exception("Failed to process update", update_id=update_id)
+            finally:
+                queue.task_done()
+
+    @staticmethod
+    def _shard_key(event: TelegramObject, data: dict[str, Any]) -> int:
+        chat: Chat | None = data.get("event_chat")
+        if chat is not None:
+            return chat.id
+        user: User | None = data.get("event_from_user")
+        if user is not None:
+            return user.id
+        return event.update_id if isinstance(event, Update) else 0
@@ -1,15 +1,20 @@
-import asyncio
-from collections.abc import Awaitable, Callable
+import time
+from collections.abc import Awaitable, Callable, Sequence
 from typing import Any
 
 from aiogram import BaseMiddleware
-from aiogram.enums import ChatMemberStatus, ChatType
-from aiogram.types import Message, TelegramObject
+from aiogram.enums import ChatType
+from aiogram.types import Message, TelegramObject, User
 from structlog import get_logger
 
+from app import metrics, tracing
 from app.bot.keyboards.subscription import get_subscription_keyboard
+from app.config import settings
+from app.services.admins import GroupAdminCache
+from app.services.channel_registry import ChannelRecord
+from app.services.deletion import DeletionScheduler
 from app.services.subscription import SubscriptionService
-from app.storage.repositories.channels import ChannelRepository
+from app.services.warnings import WarningDebouncer
 
 logger = get_logger()
 
@@ -31,48 +36,111 @@ class SubscriptionMiddleware(BaseMiddleware):
         if not user or user.is_bot:
             return await handler(event, data)
 
-        bot = data["bot"]
-        try:
-            chat_member = await bot.get_chat_member(event.chat.id, user.id)
-            if chat_member.status in (ChatMemberStatus.CREATOR, ChatMemberStatus.ADMINISTRATOR):
-                return await handler(event, data)
-        except Exception:
-            pass
-
-        session = data["session"]
-        redis_client = data["redis"]
+        started = time.perf_counter()
+        group_admins: GroupAdminCache = data["group_admins"]
+        with tracing.span("stage.admin_check"):
+            is_admin = await group_admins.is_admin(event.chat.id, user.id)
+        if is_admin:
+            _observe("admin_bypass", started)
+            return await handler(event, data)
 
-        repo = ChannelRepository(session)
-        channels = await repo.get_all_channels()
+        channels = data["channel_registry"].channels_for(event.chat.id)
 
         if not channels:
+            _observe("passed", started)
             return await handler(event, data)
 
-        service = SubscriptionService(redis_client, bot)
-        missing_channels = await service.check_user_subscription(user.id, channels)
+        service: SubscriptionService = data["subscription_service"]
+        with tracing.span("stage.subscription_check"):
+            missing_channels = await service.check_user_subscription(user.id, channels)
 
         if not missing_channels:
+            _observe("passed", started)
             return await handler(event, data)
 
         try:
-            await event.delete()
+            with tracing.span("stage.delete"):
+                await event.delete()
         except Exception as e:
             logger.warning("Failed to delete user message", error=str(e))
 
-        keyboard = get_subscription_keyboard(missing_channels)
-        warning_msg = await event.answer(
-            f"Привет, {user.full_name}!\nДля общения в чате подпишись на наши каналы:",
-            reply_markup=keyboard,
-        )
-
-        asyncio.create_task(
-            self._delete_later(warning_msg, 10)
-        )  # delete warning message after 'n(int)'seconds
+        try:
+            with tracing.span("stage.warning"):
+                await self._warn(event, user, missing_channels, data)
+        finally:
+            _observe("blocked", started)
         return
 
-    async def _delete_later(self, message: Message, delay: int):
-        await asyncio.sleep(delay)
+    async def _warn(
+        self,
+        event: Message,
+        user: User,
+        missing_channels: Sequence[ChannelRecord],
+        data: dict[str, Any],
+    ) -> None:
+        """Sends at most one warning per user per debounce window."""
+        debouncer: WarningDebouncer = data["warning_debouncer"]
+        chat_id = event.chat.id
+        signature = ",".join(str(ch.telegram_id) for ch in missing_channels)
+
+        try:
+            should_send = await debouncer.claim(chat_id, user.id)
+        except Exception as e:
+            logger.warning("Failed to check warning debounce", error=str(e))
+            should_send = True
+
+        if not should_send:
+            if settings.WARNING_EDIT_IN_PLACE:
+                await self._update_warning(event, user, missing_channels, signature, debouncer)
+            return
+
+        keyboard = get_subscription_keyboard(missing_channels)
         try:
-            await message.delete()
+            warning_msg = await event.answer(
+                f"Привет, {user.full_name}!\nДля общения в чате подпишись на наши каналы:",
+                reply_markup=keyboard,
+            )
         except Exception:
-            pass
+            try:
+                await debouncer.release(chat_id, user.id)
+            except Exception:
+                pass
+            raise
+
+        # delete warning message after WARNING_DELETE_DELAY seconds
+        deletion_scheduler: DeletionScheduler = data["deletion_scheduler"]
+        try:
+            await deletion_scheduler.schedule(
+                chat_id, warning_msg.message_id, settings.WARNING_DELETE_DELAY
+            )
+            await debouncer.remember(chat_id, user.id, warning_msg.message_id, signature)
+        except Exception as e:
+            logger.warning("Failed to schedule warning deletion", error=str(e))
+
+    async def _update_warning(
+        self,
+        event: Message,
+        user: User,
+        missing_channels: Sequence[ChannelRecord],
+        signature: str,
+        debouncer: WarningDebouncer,
+    ) -> None:
+        """Edits the current warning if the set of missing channels changed."""
+        try:
+            current = await debouncer.get(event.chat.id, user.id)
+            if current is None or current[1] == signature:
+                return
+
+            message_id = current[0]
+            await event.bot.edit_message_reply_markup(
+                chat_id=event.chat.id,
+                message_id=message_id,
+                reply_markup=get_subscription_keyboard(missing_channels),
+            )
+            await debouncer.remember(event.chat.id, user.id, message_id, signature)
+        except Exception as e:
+            logger.warning("Failed to update warning", error=str(e))
+
+
+def _observe(outcome: str, started: float) -> None:
+    metrics.SUBSCRIPTION_MIDDLEWARE_SECONDS.labels(outcome).observe(time.perf_counter() - started)
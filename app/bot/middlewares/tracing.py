@@ -0,0 +1,39 @@
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from aiogram import BaseMiddleware
+from aiogram.types import Chat, TelegramObject, Update
+
+from app import tracing
+
+
+class TracingMiddleware(BaseMiddleware):
+    """
+    Traces every update through the rest of the chain.
+
+    Must be registered as an outer update middleware after the UpdateScheduler
+    (spans are collected in the worker that processes the update) and before
+    ContainerMiddleware, so resource setup and teardown are part of the trace.
+    """
+
+    def __init__(self, tracer: tracing.Tracer) -> None:
+        self.tracer = tracer
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        if not isinstance(event, Update):
+            return await handler(event, data)
+
+        chat: Chat | None = data.get("event_chat")
+        trace, token = tracing.start_trace(
+            event.update_id, chat.id if chat else None, event.event_type
+        )
+        try:
+            return await handler(event, data)
+        finally:
+            tracing.end_trace(trace, token)
+            self.tracer.finish(trace)
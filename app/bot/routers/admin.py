@@ -6,26 +6,36 @@ from aiogram.filters import (
     PROMOTED_TRANSITION,
     ChatMemberUpdatedFilter,
     Command,
+    CommandObject,
     Filter,
 )
 from aiogram.types import ChatMemberUpdated, Message
-from sqlalchemy.ext.asyncio import AsyncSession
 from structlog import get_logger
 
+from app.bot.middlewares.scheduler import UpdateScheduler
 from app.config import settings
+from app.logging import counters as log_counters
+from app.services.channel_registry import ChannelRegistry
+from app.services.subscription import SubscriptionService
+from app.storage.cache.tiered import TieredSubscriptionCache
 from app.storage.repositories.channels import ChannelRepository
+from app.storage.repositories.group_channels import GroupChannelRepository
+from app.storage.session import LazySession
+from app.tracing import Tracer
 
 router = Router()
 logger = get_logger()
 
 
-@router.my_chat_member(ChatMemberUpdatedFilter(member_status_changed=PROMOTED_TRANSITION))
-async def on_bot_promoted(event: ChatMemberUpdated, session: AsyncSession):
-    if event.chat.type != ChatType.CHANNEL:
-        return
-
+@router.my_chat_member(
+    ChatMemberUpdatedFilter(member_status_changed=PROMOTED_TRANSITION),
+    F.chat.type == ChatType.CHANNEL,
+)
+async def on_bot_promoted(
+    event: ChatMemberUpdated, session: LazySession, channel_registry: ChannelRegistry
+):
     logger.info("Bot promoted in channel", chat_id=event.chat.id, title=event.chat.title)
-    repo = ChannelRepository(session)
+    repo = ChannelRepository(session.get())
 
     invite_link = None
     if event.chat.username:
@@ -50,34 +60,41 @@ async def on_bot_promoted(event: ChatMemberUpdated, session: AsyncSession):
         title=event.chat.title or "Unknown Channel",
         invite_link=invite_link,
     )
+    await channel_registry.refresh(session.get())
 
 
-@router.my_chat_member(ChatMemberUpdatedFilter(member_status_changed=KICKED | LEFT))
-async def on_bot_removed(event: ChatMemberUpdated, session: AsyncSession):
-    if event.chat.type != ChatType.CHANNEL:
-        return
-
+@router.my_chat_member(
+    ChatMemberUpdatedFilter(member_status_changed=KICKED | LEFT),
+    F.chat.type == ChatType.CHANNEL,
+)
+async def on_bot_removed(
+    event: ChatMemberUpdated, session: LazySession, channel_registry: ChannelRegistry
+):
     logger.info("Bot removed from channel", chat_id=event.chat.id)
-    repo = ChannelRepository(session)
-    await repo.delete_channel(event.chat.id)
+    repo = ChannelRepository(session.get())
+    if await repo.delete_channel(event.chat.id):
+        await channel_registry.refresh(session.get())
 
 
-@router.my_chat_member(ChatMemberUpdatedFilter(member_status_changed=~PROMOTED_TRANSITION))
-async def on_bot_demoted(event: ChatMemberUpdated, session: AsyncSession):
+@router.my_chat_member(
+    ChatMemberUpdatedFilter(member_status_changed=~PROMOTED_TRANSITION),
+    F.chat.type == ChatType.CHANNEL,
+)
+async def on_bot_demoted(
+    event: ChatMemberUpdated, session: LazySession, channel_registry: ChannelRegistry
+):
     """
     Handle cases where bot loses admin rights but is not kicked/left
     (e.g. demoted to regular member).
     Although in channels bots MUST be admins to properly function usually,
     if it is not admin, we should probably remove it from our active list.
     """
-    if event.chat.type != ChatType.CHANNEL:
-        return
-
     new_status = event.new_chat_member.status
     if new_status not in ["administrator", "creator"]:
         logger.info("Bot demoted in channel", chat_id=event.chat.id)
-        repo = ChannelRepository(session)
-        await repo.delete_channel(event.chat.id)
+        repo = ChannelRepository(session.get())
+        if await repo.delete_channel(event.chat.id):
+            await channel_registry.refresh(session.get())
 
 
 class AdminFilter(Filter):
@@ -90,8 +107,10 @@ class AdminFilter(Filter):
 
 
 @router.message(Command("channels"), F.chat.type == "private", AdminFilter())
-async def cmd_channels(message: Message, session: AsyncSession):
-    repo = ChannelRepository(session)
+async def cmd_channels(
+    message: Message, session: LazySession, subscription_cache: TieredSubscriptionCache
+):
+    repo = ChannelRepository(session.get())
     channels = await repo.get_all_channels()
 
     if not channels:
@@ -100,8 +119,164 @@ async def cmd_channels(message: Message, session: AsyncSession):
 
     text = "<b>Список ваших каналов:</b>\n\n"
     for ch in channels:
-        text += f"ID: <code>{ch.telegram_id}</code> | {ch.title}\n"
+        text += f"ID: <code>{ch.telegram_id}</code> | {ch.title}"
+        # only the bitmap cache layout can count members
+        members = await subscription_cache.count_members([ch.telegram_id])
+        if members is not None:
+            text += f" | подписчиков в кэше: {members}"
+        text += "\n"
+
+    if len(channels) > 1:
+        members = await subscription_cache.count_members([ch.telegram_id for ch in channels])
+        if members is not None:
+            text += f"\nПодписаны на все каналы: {members}\n"
+
+    await message.answer(text)
+
+
+def parse_link_args(command: CommandObject) -> tuple[int, int] | None:
+    """Parses "<group_id> <channel_id>"."""
+    try:
+        group_id, channel_id = map(int, (command.args or "").split())
+    except ValueError:
+        return None
+    return group_id, channel_id
+
+
+@router.message(Command("link"), F.chat.type == "private", AdminFilter())
+async def cmd_link(
+    message: Message,
+    command: CommandObject,
+    session: LazySession,
+    channel_registry: ChannelRegistry,
+):
+    args = parse_link_args(command)
+    if args is None:
+        await message.answer("Использование: /link &lt;ID группы&gt; &lt;ID канала&gt;")
+        return
+
+    group_id, channel_id = args
+    channel = channel_registry.get(channel_id)
+    if channel is None:
+        await message.answer("Канал не найден. Сначала добавьте бота администратором в канал.")
+        return
+
+    repo = GroupChannelRepository(session.get())
+    if not await repo.link(group_id, channel_id):
+        await message.answer("Канал уже привязан к этой группе.")
+        return
+
+    await channel_registry.refresh(session.get())
+    logger.info("Channel linked to group", group_id=group_id, channel_id=channel_id)
+    await message.answer(f"Канал {channel.title} привязан к группе <code>{group_id}</code>.")
+
+
+@router.message(Command("unlink"), F.chat.type == "private", AdminFilter())
+async def cmd_unlink(
+    message: Message,
+    command: CommandObject,
+    session: LazySession,
+    channel_registry: ChannelRegistry,
+):
+    args = parse_link_args(command)
+    if args is None:
+        await message.answer("Использование: /unlink &lt;ID группы&gt; &lt;ID канала&gt;")
+        return
 
+    group_id, channel_id = args
+    repo = GroupChannelRepository(session.get())
+    if not await repo.unlink(group_id, channel_id):
+        await message.answer("Канал не был привязан к этой группе.")
+        return
+
+    await channel_registry.refresh(session.get())
+    logger.info("Channel unlinked from group", group_id=group_id, channel_id=channel_id)
+    await message.answer(
+        f"Канал <code>{channel_id}</code> отвязан от группы <code>{group_id}</code>."
+    )
+
+
+@router.message(Command("links"), F.chat.type == "private", AdminFilter())
+async def cmd_links(message: Message, channel_registry: ChannelRegistry):
+    if settings.GROUP_CHANNELS_FALLBACK_ALL:
+        fallback = "В остальных группах требуется подписка на все каналы."
+    else:
+        fallback = "В остальных группах подписка не проверяется."
+
+    if not channel_registry.groups:
+        await message.answer(f"Привязок нет. {fallback}")
+        return
+
+    text = "<b>Каналы по группам:</b>\n\n"
+    for group_id, channels in channel_registry.groups.items():
+        titles = ", ".join(ch.title for ch in channels) or "подписка не проверяется"
+        text += f"Группа <code>{group_id}</code>: {titles}\n"
+    text += f"\n{fallback}"
+
+    await message.answer(text)
+
+
+@router.message(Command("status"), F.chat.type == "private", AdminFilter())
+async def cmd_status(
+    message: Message,
+    update_scheduler: UpdateScheduler,
+    subscription_cache: TieredSubscriptionCache,
+    subscription_service: SubscriptionService,
+):
+    stats = update_scheduler.stats()
+    cache = subscription_cache.stats()
+    breaker = subscription_service.breaker
+    degraded = subscription_service.counters
+    await message.answer(
+        "<b>Очередь обновлений:</b>\n\n"
+        f"Воркеров: {stats['workers']}\n"
+        f"В очереди: {stats['queued']} (макс. в одной: {stats['busiest_queue']})\n"
+        f"Задержка: {stats['lag']} с (макс. {stats['max_lag']} с)\n\n"
+        "<b>Кэш подписок:</b>\n\n"
+        f"L1: {cache.get('l1_hits', 0)} попаданий / {cache.get('l1_misses', 0)} промахов, "
+        f"записей: {cache['l1_size']}\n"
+        f"L2: {cache.get('l2_hits', 0)} попаданий / {cache.get('l2_misses', 0)} промахов\n\n"
+        "<b>Проверки через Bot API:</b>\n\n"
+        f"Circuit breaker: {breaker.state} (открывался: {breaker.counters['to_open']}, "
+        f"отклонено: {breaker.counters['rejected']})\n"
+        f"Без ответа API: пропущено {degraded['failed_open']}, "
+        f"заблокировано {degraded['failed_closed']}\n\n"
+        "<b>Логи:</b>\n\n"
+        f"Отброшено по лимиту: {log_counters['rate_limit']}, "
+        f"записано выборкой: {log_counters['sampled']}, "
+        f"потеряно при полной очереди: {log_counters['queue_full']}"
+    )
+
+
+TRACE_REPORT_ROWS = 15
+
+
+@router.message(Command("trace"), F.chat.type == "private", AdminFilter())
+async def cmd_trace(message: Message, tracer: Tracer):
+    if not settings.TRACING_ENABLED:
+        await message.answer("Трассировка выключена (TRACING_ENABLED=false).")
+        return
+
+    summary = tracer.report.summary()
+    updates = summary.pop("update", None)
+    if updates is None:
+        await message.answer("Нет данных за последние минуты.")
+        return
+
+    slow = summary.pop("slow", None)
+    window = int(tracer.report.window)
+    text = (
+        f"<b>Обновления за {window} с:</b> {updates.count}, "
+        f"в среднем {updates.avg * 1000:.1f} мс, макс. {updates.max * 1000:.1f} мс\n"
+        f"Медленнее {tracer.slow_threshold} с: {slow.count if slow else 0}\n\n"
+        "<b>Этапы</b> (вызовов / среднее / макс. / доля времени):\n\n"
+    )
+    for name, stats in list(summary.items())[:TRACE_REPORT_ROWS]:
+        share = stats.total / updates.total * 100 if updates.total else 0
+        text += (
+            f"<code>{name}</code>: {stats.count} / {stats.avg * 1000:.1f} мс / "
+            f"{stats.max * 1000:.1f} мс / {share:.0f}%\n"
+        )
     await message.answer(text)
 
 
@@ -112,5 +287,10 @@ async def cmd_start(message: Message):
         "Просто добавьте меня администратором в канал, и я автоматически сохраню его.\n"
         "Если убрать меня из администраторов или удалить из канала, я удалю его из базы.\n\n"
         "Команды:\n"
-        " /channels - список подключенных каналов"
+        " /channels - список подключенных каналов\n"
+        " /link &lt;группа&gt; &lt;канал&gt; - требовать канал только в этой группе\n"
+        " /unlink &lt;группа&gt; &lt;канал&gt; - отвязать канал от группы\n"
+        " /links - каналы по группам\n"
+        " /status - состояние очереди обновлений и кэша\n"
+        " /trace - на что уходит время обработки (при TRACING_ENABLED)"
     )
@@ -0,0 +1,61 @@
+from aiogram import F, Router
+from aiogram.enums import ChatMemberStatus, ChatType
+from aiogram.types import ChatMemberUpdated
+from structlog import get_logger
+
+from app.services.admins import GroupAdminCache
+from app.services.channel_registry import ChannelRegistry
+from app.services.subscription import SUBSCRIBED_STATUSES
+from app.storage.cache.tiered import TieredSubscriptionCache
+
+router = Router()
+logger = get_logger()
+
+ADMIN_STATUSES = (ChatMemberStatus.CREATOR, ChatMemberStatus.ADMINISTRATOR)
+GROUP_TYPES = {ChatType.GROUP, ChatType.SUPERGROUP}
+
+# Membership changes in registered channels feed the subscription cache directly,
+# so the bot rarely has to poll get_chat_member. Telegram only sends chat_member
+# updates to admins, which the bot always is in a registered channel.
+
+
+@router.chat_member(F.chat.type == ChatType.CHANNEL)
+async def on_channel_member_updated(
+    event: ChatMemberUpdated,
+    channel_registry: ChannelRegistry,
+    subscription_cache: TieredSubscriptionCache,
+):
+    if channel_registry.get(event.chat.id) is None:
+        return
+
+    # the same rule as a get_chat_member check, so both fill the cache alike
+    was_subscribed = event.old_chat_member.status in SUBSCRIBED_STATUSES
+    is_subscribed = event.new_chat_member.status in SUBSCRIBED_STATUSES
+    if was_subscribed == is_subscribed:
+        return
+
+    user_id = event.new_chat_member.user.id
+    try:
+        await subscription_cache.set_status(user_id, event.chat.id, is_subscribed)
+    except Exception as e:
+        logger.warning("Failed to cache channel membership", chat_id=event.chat.id, error=str(e))
+
+
+# Promotions and demotions in groups keep the cached admin sets in sync.
+
+
+@router.chat_member(F.chat.type.in_(GROUP_TYPES))
+async def on_group_member_updated(event: ChatMemberUpdated, group_admins: GroupAdminCache):
+    was_admin = event.old_chat_member.status in ADMIN_STATUSES
+    is_admin = event.new_chat_member.status in ADMIN_STATUSES
+    if was_admin != is_admin:
+        logger.info("Group admins changed", chat_id=event.chat.id)
+        await group_admins.refresh(event.chat.id)
+
+
+@router.my_chat_member(F.chat.type.in_(GROUP_TYPES))
+async def on_bot_group_status_updated(event: ChatMemberUpdated, group_admins: GroupAdminCache):
+    if event.new_chat_member.status in (ChatMemberStatus.LEFT, ChatMemberStatus.KICKED):
+        await group_admins.forget(event.chat.id)
+    else:
+        await group_admins.refresh(event.chat.id)
@@ -1,4 +1,6 @@
-from pydantic import PostgresDsn, RedisDsn
+from typing import Literal
+
+from pydantic import PostgresDsn, RedisDsn, model_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -10,5 +12,136 @@ class Settings(BaseSettings):
     REDIS_DSN: RedisDsn
     ADMIN_ID: int
 
+    LOG_LEVEL: str = "INFO"
+    # Lines waiting for the background log writer; more are dropped
+    LOG_QUEUE_SIZE: int = 10_000
+    # Each event type is logged in full LOG_RATE_LIMIT times per LOG_RATE_WINDOW seconds,
+    # then one in LOG_SAMPLE_EVERY (0 drops the rest); errors are never limited
+    LOG_RATE_LIMIT: int = 20
+    LOG_RATE_WINDOW: float = 10.0
+    LOG_SAMPLE_EVERY: int = 100
+
+    # Update ingestion: long polling (single process) or webhook (several workers)
+    BOT_MODE: Literal["polling", "webhook"] = "polling"
+    WEBHOOK_BASE_URL: str | None = None  # public https URL Telegram sends updates to
+    WEBHOOK_PATH: str = "/webhook"
+    WEBHOOK_SECRET: str | None = None  # checked against X-Telegram-Bot-Api-Secret-Token
+    WEBHOOK_HOST: str = "0.0.0.0"
+    WEBHOOK_PORT: int = 8080
+    WEBHOOK_WORKERS: int = 1
+
+    # Update processing pool: updates are sharded by chat into bounded per-worker queues
+    UPDATE_WORKERS: int = 32
+    UPDATE_QUEUE_SIZE: int = 100
+
+    # Database connection pool
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_PRE_PING: bool = True
+    DB_POOL_RECYCLE: int = 1800
+    DB_STATEMENT_CACHE_SIZE: int = 100  # asyncpg prepared statements per connection
+
+    # How often other instances' channel changes are picked up (seconds)
+    CHANNELS_VERSION_POLL_INTERVAL: float = 5.0
+    # Groups without channels linked by /link require every registered channel
+    GROUP_CHANNELS_FALLBACK_ALL: bool = True
+
+    # Subscription checks: max parallel channel checks per message and per-check deadline
+    SUBSCRIPTION_CHECK_CONCURRENCY: int = 8
+    SUBSCRIPTION_CHECK_TIMEOUT: float = 5.0
+    # Share in-flight checks across bot instances through Redis locks
+    SUBSCRIPTION_CHECK_REDIS_LOCK: bool = False
+    # Cached statuses are kept fresh by chat_member updates, so the TTL can be long
+    SUBSCRIPTION_CACHE_TTL: int = 3600
+    # Confirmed "not subscribed" results are cached briefly to absorb spam from non-members
+    SUBSCRIPTION_NEGATIVE_CACHE_TTL: int = 30
+    # Revalidate subscribers in the background this long before SUBSCRIPTION_CACHE_TTL ends
+    SUBSCRIPTION_REFRESH_AHEAD: int = 300
+    # ...and keep letting them through for this long after it while revalidation runs
+    SUBSCRIPTION_STALE_GRACE: int = 600
+    # When membership cannot be checked: "closed" blocks the message, "open" lets it through
+    MEMBERSHIP_FAILURE_POLICY: Literal["open", "closed"] = "closed"
+
+    # Circuit breaker around get_chat_member
+    BREAKER_WINDOW: int = 50
+    BREAKER_MIN_CALLS: int = 10
+    BREAKER_FAILURE_RATE: float = 0.5
+    BREAKER_SLOW_CALL_DURATION: float = 2.0
+    BREAKER_SLOW_CALL_RATE: float = 0.5
+    BREAKER_OPEN_DURATION: float = 30.0
+    BREAKER_HALF_OPEN_CALLS: int = 3
+    # In-process cache in front of Redis (0 entries disables it)
+    SUBSCRIPTION_L1_MAX_ENTRIES: int = 100_000
+    SUBSCRIPTION_L1_TTL: float = 30.0
+    # Redis layout: "keys" (one key per user and channel) or "bitmap" (per-channel member
+    # bitmaps in SUBSCRIPTION_BITMAP_GENERATION-second generations, countable by /channels)
+    SUBSCRIPTION_CACHE_LAYOUT: Literal["keys", "bitmap"] = "keys"
+    SUBSCRIPTION_BITMAP_GENERATION: int = 600
+    # Durable copy of verified statuses in Postgres, written behind in batches;
+    # refills Redis in bulk when it comes back empty
+    SUBSCRIPTION_STORE_ENABLED: bool = True
+    SUBSCRIPTION_STORE_FLUSH_INTERVAL: float = 2.0
+    SUBSCRIPTION_STORE_BATCH_SIZE: int = 1000
+    SUBSCRIPTION_STORE_MAX_BUFFER: int = 100_000
+    SUBSCRIPTION_REFILL_CHECK_INTERVAL: float = 30.0
+
+    # Group admin sets: shared Redis copy and per-instance in-memory copy
+    GROUP_ADMINS_TTL: int = 3600
+    GROUP_ADMINS_LOCAL_TTL: float = 60.0
+
+    # Outgoing Bot API scheduling (requests per second)
+    # Sends, edits, deletes and other writes; reads have their own budget (0: unlimited)
+    API_GLOBAL_RATE: float = 30.0
+    API_READ_RATE: float = 200.0
+    API_CHAT_SEND_RATE: float = 20 / 60
+    API_CHAT_SEND_BURST: float = 3
+    API_CHAT_DELETE_RATE: float = 20.0
+    API_CHAT_DELETE_BURST: float = 20
+    API_MAX_RETRIES: int = 3
+
+    # At most FLOOD_LIMIT messages per user and chat within FLOOD_WINDOW seconds (0 disables)
+    FLOOD_LIMIT: int = 10
+    FLOOD_WINDOW: float = 10.0
+
+    # Subscription warnings are deleted after this many seconds
+    WARNING_DELETE_DELAY: float = 10.0
+    # At most one warning per user and chat within this window (seconds)
+    WARNING_DEBOUNCE_WINDOW: float = 10.0
+    # Refresh the keyboard of the existing warning instead of staying silent
+    WARNING_EDIT_IN_PLACE: bool = False
+    # How often the persistent deletion queue is processed (seconds)
+    DELETE_QUEUE_TICK: float = 1.0
+
+    # Per-update tracing: updates slower than TRACING_SLOW_UPDATE seconds are logged with
+    # their spans; span statistics over TRACING_REPORT_WINDOW seconds are shown by /trace
+    TRACING_ENABLED: bool = False
+    TRACING_SLOW_UPDATE: float = 1.0
+    TRACING_REPORT_WINDOW: float = 300.0
+
+    # Before taking traffic: verify channels and prefetch group admin sets
+    WARMUP_ENABLED: bool = True
+    WARMUP_CONCURRENCY: int = 10
+    # Readiness for orchestrators: a file present while ready, and /healthz + /readyz
+    # served on HEALTH_PORT in polling mode (webhook workers serve them on the webhook port)
+    READINESS_FILE: str | None = None
+    HEALTH_HOST: str = "0.0.0.0"
+    HEALTH_PORT: int | None = None
+
+    # Prometheus metrics on a local HTTP port (needs the `metrics` extra)
+    METRICS_ENABLED: bool = False
+    METRICS_HOST: str = "127.0.0.1"
+    METRICS_PORT: int = 9100  # webhook worker N listens on METRICS_PORT + N
+
+    @model_validator(mode="after")
+    def check_webhook(self) -> "Settings":
+        if self.BOT_MODE == "webhook" and not self.WEBHOOK_BASE_URL:
+            raise ValueError("WEBHOOK_BASE_URL is required when BOT_MODE=webhook")
+        return self
+
+    @property
+    def workers(self) -> int:
+        """Number of processes sharing the bot token."""
+        return self.WEBHOOK_WORKERS if self.BOT_MODE == "webhook" else 1
+
 
 settings = Settings()
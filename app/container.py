@@ -4,7 +4,10 @@ from contextlib import asynccontextmanager
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
+from aiogram.fsm.storage.base import BaseStorage
 from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.fsm.storage.redis import RedisStorage
+from aiogram.methods import GetChatMember
 from redis.asyncio import Redis, from_url
 from sqlalchemy.ext.asyncio import (
     AsyncEngine,
@@ -14,8 +17,30 @@ from sqlalchemy.ext.asyncio import (
 )
 from structlog import get_logger
 
-from app.bot.middlewares.request import RetryRequestMiddleware
+from app import metrics
+from app.bot.middlewares.request import (
+    BreakerRequestMiddleware,
+    MetricsRequestMiddleware,
+    RateLimitRequestMiddleware,
+    RetryRequestMiddleware,
+    TracingRequestMiddleware,
+)
+from app.bot.middlewares.scheduler import UpdateScheduler
 from app.config import settings
+from app.services.admins import GroupAdminCache
+from app.services.channel_registry import ChannelRegistry
+from app.services.circuit import CircuitBreaker
+from app.services.deletion import DeletionScheduler
+from app.services.flood import FloodLimiter
+from app.services.readiness import Readiness
+from app.services.subscription import SubscriptionService
+from app.services.warmup import WarmUp
+from app.services.warnings import WarningDebouncer
+from app.storage.cache.bitmap import BitmapSubscriptionCache
+from app.storage.cache.subscriptions import SubscriptionCache
+from app.storage.cache.tiered import TieredSubscriptionCache
+from app.storage.subscription_store import SubscriptionStore
+from app.tracing import Tracer
 
 logger = get_logger()
 
@@ -26,21 +51,183 @@ class Container:
         self.bot = Bot(
             token=settings.BOT_TOKEN, default=DefaultBotProperties(parse_mode=ParseMode.HTML)
         )
-        self.bot.session.middleware.register(RetryRequestMiddleware())
+        self.redis: Redis = from_url(
+            str(settings.REDIS_DSN), encoding="utf-8", decode_responses=True
+        )
+
+        self.membership_breaker = CircuitBreaker(
+            "get_chat_member",
+            window=settings.BREAKER_WINDOW,
+            min_calls=settings.BREAKER_MIN_CALLS,
+            failure_rate=settings.BREAKER_FAILURE_RATE,
+            slow_call_duration=settings.BREAKER_SLOW_CALL_DURATION,
+            slow_call_rate=settings.BREAKER_SLOW_CALL_RATE,
+            open_duration=settings.BREAKER_OPEN_DURATION,
+            half_open_calls=settings.BREAKER_HALF_OPEN_CALLS,
+        )
 
-        self.dp = Dispatcher(storage=MemoryStorage())
+        # order matters: each retry goes through the rate limiter again
+        if settings.TRACING_ENABLED:
+            self.bot.session.middleware.register(TracingRequestMiddleware())
+        self.bot.session.middleware.register(
+            RetryRequestMiddleware(max_retries=settings.API_MAX_RETRIES)
+        )
+        self.bot.session.middleware.register(
+            RateLimitRequestMiddleware(
+                # every worker process gets its share of the global limit
+                global_rate=settings.API_GLOBAL_RATE / settings.workers,
+                chat_send_rate=settings.API_CHAT_SEND_RATE,
+                chat_send_burst=settings.API_CHAT_SEND_BURST,
+                chat_delete_rate=settings.API_CHAT_DELETE_RATE,
+                chat_delete_burst=settings.API_CHAT_DELETE_BURST,
+                read_rate=settings.API_READ_RATE / settings.workers,
+            )
+        )
+        # below the rate limiter: the breaker sees API latency, not our queueing
+        self.bot.session.middleware.register(
+            BreakerRequestMiddleware(self.membership_breaker, methods=(GetChatMember,))
+        )
+        if metrics.ENABLED:
+            self.bot.session.middleware.register(MetricsRequestMiddleware())
+
+        # FSM state lives in Redis only when webhook workers need to share it: the
+        # FSM middleware reads the state of every update, a Redis GET each
+        storage: BaseStorage
+        if settings.BOT_MODE == "webhook":
+            storage = RedisStorage(self.redis)
+        else:
+            storage = MemoryStorage()
+        self.dp = Dispatcher(storage=storage)
+        self.update_scheduler = UpdateScheduler(
+            workers=settings.UPDATE_WORKERS, queue_size=settings.UPDATE_QUEUE_SIZE
+        )
 
         self.engine: AsyncEngine = create_async_engine(
-            str(settings.POSTGRES_DSN), echo=False, future=True
+            str(settings.POSTGRES_DSN),
+            echo=False,
+            future=True,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_pre_ping=settings.DB_POOL_PRE_PING,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+            connect_args={"prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE},
         )
         self.session_factory = async_sessionmaker(
             self.engine, class_=AsyncSession, expire_on_commit=False
         )
-        self.redis: Redis = from_url(
-            str(settings.REDIS_DSN), encoding="utf-8", decode_responses=True
+        self.channel_registry = ChannelRegistry(
+            self.session,
+            self.redis,
+            poll_interval=settings.CHANNELS_VERSION_POLL_INTERVAL,
+            fallback_all=settings.GROUP_CHANNELS_FALLBACK_ALL,
+        )
+        self.deletion_scheduler = DeletionScheduler(
+            self.redis, self.bot, tick=settings.DELETE_QUEUE_TICK
+        )
+        self.flood_limiter = FloodLimiter(
+            self.redis, limit=settings.FLOOD_LIMIT, window=settings.FLOOD_WINDOW
+        )
+        self.warning_debouncer = WarningDebouncer(
+            self.redis, window=settings.WARNING_DEBOUNCE_WINDOW
+        )
+        self.group_admins = GroupAdminCache(
+            self.redis,
+            self.bot,
+            ttl=settings.GROUP_ADMINS_TTL,
+            local_ttl=settings.GROUP_ADMINS_LOCAL_TTL,
+        )
+        redis_subscriptions: SubscriptionCache
+        if settings.SUBSCRIPTION_CACHE_LAYOUT == "bitmap":
+            redis_subscriptions = BitmapSubscriptionCache(
+                self.redis,
+                ttl=settings.SUBSCRIPTION_CACHE_TTL,
+                negative_ttl=settings.SUBSCRIPTION_NEGATIVE_CACHE_TTL,
+                stale_grace=settings.SUBSCRIPTION_STALE_GRACE,
+                generation=settings.SUBSCRIPTION_BITMAP_GENERATION,
+            )
+        else:
+            redis_subscriptions = SubscriptionCache(
+                self.redis,
+                ttl=settings.SUBSCRIPTION_CACHE_TTL,
+                negative_ttl=settings.SUBSCRIPTION_NEGATIVE_CACHE_TTL,
+                stale_grace=settings.SUBSCRIPTION_STALE_GRACE,
+            )
+        self.subscription_store: SubscriptionStore | None = None
+        if settings.SUBSCRIPTION_STORE_ENABLED:
+            self.subscription_store = SubscriptionStore(
+                self.session,
+                self.redis,
+                redis_subscriptions,
+                flush_interval=settings.SUBSCRIPTION_STORE_FLUSH_INTERVAL,
+                batch_size=settings.SUBSCRIPTION_STORE_BATCH_SIZE,
+                max_buffer=settings.SUBSCRIPTION_STORE_MAX_BUFFER,
+                refill_check_interval=settings.SUBSCRIPTION_REFILL_CHECK_INTERVAL,
+            )
+        self.subscription_cache = TieredSubscriptionCache(
+            redis_subscriptions,
+            self.redis,
+            max_entries=settings.SUBSCRIPTION_L1_MAX_ENTRIES,
+            ttl=settings.SUBSCRIPTION_L1_TTL,
+            store=self.subscription_store,
         )
+        self.subscription_service = SubscriptionService(
+            self.subscription_cache,
+            self.bot,
+            concurrency=settings.SUBSCRIPTION_CHECK_CONCURRENCY,
+            check_timeout=settings.SUBSCRIPTION_CHECK_TIMEOUT,
+            redis_lock=settings.SUBSCRIPTION_CHECK_REDIS_LOCK,
+            cache_ttl=settings.SUBSCRIPTION_CACHE_TTL,
+            refresh_ahead=settings.SUBSCRIPTION_REFRESH_AHEAD,
+            stale_grace=settings.SUBSCRIPTION_STALE_GRACE,
+            breaker=self.membership_breaker,
+            failure_policy=settings.MEMBERSHIP_FAILURE_POLICY,
+        )
+        self.warmup = WarmUp(
+            self.bot,
+            self.redis,
+            self.session,
+            self.channel_registry,
+            self.group_admins,
+            concurrency=settings.WARMUP_CONCURRENCY,
+        )
+        self.readiness = Readiness(settings.READINESS_FILE)
+        self.tracer = Tracer(
+            slow_threshold=settings.TRACING_SLOW_UPDATE,
+            report_window=settings.TRACING_REPORT_WINDOW,
+        )
+
+        metrics.track_background("update_queue", lambda: self.update_scheduler.depth)
+        metrics.track_background(
+            "subscription_revalidations", lambda: self.subscription_service.pending
+        )
+        if self.subscription_store is not None:
+            store = self.subscription_store
+            metrics.track_background("subscription_writes", lambda: store.pending)
+
+    async def start(self):
+        """Loads in-process state, starts background loops and reports readiness."""
+        if settings.WARMUP_ENABLED:
+            await self.warmup.run()
+        else:
+            await self.channel_registry.load()
+        if self.subscription_store is not None:
+            await self.subscription_store.refill_if_cold()
+            self.subscription_store.start()
+        self.channel_registry.start()
+        self.deletion_scheduler.start()
+        self.subscription_cache.start()
+        self.update_scheduler.start()
+        self.readiness.set_ready()
 
     async def dispose(self):
+        self.readiness.set_not_ready()
+        await self.update_scheduler.stop()
+        await self.subscription_service.stop()
+        await self.channel_registry.stop()
+        await self.deletion_scheduler.stop()
+        await self.subscription_cache.stop()
+        if self.subscription_store is not None:
+            await self.subscription_store.stop()  # writes out what is still buffered
         await self.bot.session.close()
         await self.engine.dispose()
         await self.redis.close()
@@ -1,23 +1,197 @@
+"""
+Structured logging that stays off the event loop.
+
+Events are rendered to JSON (with orjson if the `logging` extra is installed)
+and handed to a background thread that writes them to stdout; a full queue
+drops lines instead of blocking. Repeated events of one type are rate-limited
+and sampled, so a raid cannot turn warnings into a CPU hog.
+"""
+
+import atexit
+import json
 import logging
+import queue
 import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, BinaryIO
 
 import structlog
 
+from app import metrics
+from app.config import settings
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# levels that are never rate-limited
+UNLIMITED_LEVELS = frozenset({"error", "exception", "critical", "fatal"})
+MAX_TRACKED_EVENTS = 10_000
+WRITE_BATCH = 512
+
+_writer: "QueueWriter | None" = None
+
+# events not written in full, by reason (rate_limit, sampled, queue_full); kept
+# in process for /status, whether or not Prometheus metrics are enabled
+counters: Counter[str] = Counter()
+
+
+class QueueWriter:
+    """Writes lines to a stream from a background thread, dropping them when the queue is full."""
+
+    def __init__(self, stream: BinaryIO, max_size: int) -> None:
+        self._stream = stream
+        self._queue: queue.Queue[bytes | None] = queue.Queue(max_size)
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def write(self, line: bytes) -> None:
+        try:
+            self._queue.put_nowait(line)
+        except queue.Full:
+            _count("queue_full")
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Writes out what is queued and stops the thread."""
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+    def _run(self) -> None:
+        while True:
+            lines = [self._queue.get()]
+            while len(lines) < WRITE_BATCH:
+                try:
+                    lines.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = None in lines
+            try:
+                self._stream.write(b"".join(line for line in lines if line is not None))
+                self._stream.flush()
+            except Exception:
+                pass  # nowhere left to report it
+            if stop:
+                return
+
+
+class QueueLogger:
+    """structlog logger that hands rendered events to a QueueWriter."""
+
+    def __init__(self, writer: QueueWriter) -> None:
+        self._writer = writer
+
+    def msg(self, message: bytes | str) -> None:
+        if isinstance(message, str):
+            message = message.encode()
+        self._writer.write(message + b"\n")
+
+    log = debug = info = warn = warning = msg
+    fatal = failure = err = error = critical = exception = msg
+
+
+class QueueHandler(logging.Handler):
+    """Sends stdlib records (aiogram, aiohttp) through the same writer."""
+
+    def __init__(self, writer: QueueWriter) -> None:
+        super().__init__()
+        self._writer = writer
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            self._writer.write(self.format(record).encode() + b"\n")
+        except Exception:
+            self.handleError(record)
+
+
+class _Window:
+    __slots__ = ("started", "count", "suppressed")
+
+    def __init__(self, started: float, suppressed: int = 0) -> None:
+        self.started = started
+        self.count = 0
+        self.suppressed = suppressed
+
+
+class EventRateLimiter:
+    """
+    structlog processor: each event type (level and event text) is logged in full
+    at most `limit` times per `window` seconds; beyond that only every
+    `sample_every`-th one is (0: none), marked with `sampled`. A logged event
+    reports how many of its type were dropped before it in `suppressed`. Errors
+    are never limited.
+    """
+
+    def __init__(self, limit: int, window: float, sample_every: int) -> None:
+        self.limit = limit
+        self.window = window
+        self.sample_every = sample_every
+        self._windows: dict[tuple[str, str], _Window] = {}
+
+    def __call__(self, logger: Any, method_name: str, event_dict: dict[str, Any]) -> Any:
+        if self.limit <= 0 or method_name in UNLIMITED_LEVELS:
+            return event_dict
+
+        key = (method_name, str(event_dict.get("event")))
+        now = time.monotonic()
+        state = self._windows.get(key)
+        if state is None or now - state.started >= self.window:
+            if len(self._windows) >= MAX_TRACKED_EVENTS:
+                self._windows.clear()
+            state = self._windows[key] = _Window(now, state.suppressed if state else 0)
+
+        state.count += 1
+        if state.count > self.limit:
+            over = state.count - self.limit
+            if not self.sample_every or over % self.sample_every:
+                state.suppressed += 1
+                _count("rate_limit")
+                raise structlog.DropEvent
+            _count("sampled")
+            event_dict["sampled"] = self.sample_every
+
+        if state.suppressed:
+            event_dict["suppressed"] = state.suppressed
+            state.suppressed = 0
+        return event_dict
+
+
+def _count(reason: str) -> None:
+    counters[reason] += 1
+    metrics.LOG_EVENTS_DROPPED.labels(reason).inc()
+
 
 def setup_logging():
-    logging.basicConfig(
-        format="%(message)s",
-        stream=sys.stdout,
-        level=logging.INFO,
-    )
+    global _writer
+    if _writer is None:
+        _writer = QueueWriter(sys.stdout.buffer, settings.LOG_QUEUE_SIZE)
+        atexit.register(_writer.close)
+    level = logging.getLevelNamesMapping()[settings.LOG_LEVEL.upper()]
+
+    handler = QueueHandler(_writer)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logging.basicConfig(level=level, handlers=[handler], force=True)
+
+    if orjson is not None:
+        renderer = structlog.processors.JSONRenderer(serializer=orjson.dumps)
+    else:
+        renderer = structlog.processors.JSONRenderer(serializer=json.dumps)
 
     structlog.configure(
         processors=[
             structlog.contextvars.merge_contextvars,
             structlog.processors.add_log_level,
+            # before any formatting, so dropped events cost next to nothing
+            EventRateLimiter(
+                settings.LOG_RATE_LIMIT, settings.LOG_RATE_WINDOW, settings.LOG_SAMPLE_EVERY
+            ),
             structlog.processors.TimeStamper(fmt="iso"),
-            structlog.processors.JSONRenderer(),
+            structlog.processors.format_exc_info,
+            renderer,
         ],
-        logger_factory=structlog.PrintLoggerFactory(),
+        wrapper_class=structlog.make_filtering_bound_logger(level),
+        logger_factory=lambda *args: QueueLogger(_writer),
         cache_logger_on_first_use=True,
     )
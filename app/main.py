@@ -1,28 +1,166 @@
 import asyncio
+import multiprocessing
+import signal
+import sys
 
+from aiogram import Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
+from structlog import get_logger
+
+from app import metrics
 from app.bot.middlewares.container import ContainerMiddleware
+from app.bot.middlewares.flood import FloodMiddleware
 from app.bot.middlewares.subscription import SubscriptionMiddleware
-from app.bot.routers import admin
+from app.bot.middlewares.tracing import TracingMiddleware
+from app.bot.routers import admin, members
+from app.config import settings
 from app.container import Container
 from app.logging import setup_logging
 
+logger = get_logger()
 
-async def main():
-    setup_logging()
 
+def setup_dispatcher(container: Container) -> Dispatcher:
+    # the scheduler goes first: everything after it runs on its worker pool
+    container.dp.update.outer_middleware(container.update_scheduler)
+    if settings.TRACING_ENABLED:
+        container.dp.update.outer_middleware(TracingMiddleware(container.tracer))
+    container.dp.update.outer_middleware(ContainerMiddleware(container))
+    if settings.FLOOD_LIMIT > 0:
+        container.dp.message.outer_middleware(FloodMiddleware())
+    container.dp.message.outer_middleware(SubscriptionMiddleware())
+    container.dp.include_router(admin.router)
+    container.dp.include_router(members.router)
+    return container.dp
+
+
+async def run_polling():
     container = Container()
+    health = None
 
     try:
-        container.dp.update.outer_middleware(ContainerMiddleware(container))
-        container.dp.message.outer_middleware(SubscriptionMiddleware())
-        container.dp.include_router(admin.router)
+        dp = setup_dispatcher(container)
+        if settings.HEALTH_PORT is not None:
+            # up during warm-up too, /readyz answers 503 until the bot is ready
+            health = await container.readiness.serve(settings.HEALTH_HOST, settings.HEALTH_PORT)
+        await container.start()
+        metrics.start_metrics_server(settings.METRICS_PORT)
 
         await container.bot.delete_webhook(drop_pending_updates=True)
-        await container.dp.start_polling(container.bot)
+        # the update scheduler bounds concurrency and applies backpressure to the poller
+        await dp.start_polling(container.bot, handle_as_tasks=False)
 
     finally:
         await container.dispose()
+        if health is not None:
+            await health.cleanup()
+
+
+async def set_webhook():
+    """Registers the webhook once, before workers start accepting updates."""
+    container = Container()
+
+    try:
+        dp = setup_dispatcher(container)
+        await container.bot.set_webhook(
+            url=f"{settings.WEBHOOK_BASE_URL}{settings.WEBHOOK_PATH}",
+            secret_token=settings.WEBHOOK_SECRET,
+            allowed_updates=dp.resolve_used_update_types(),
+            drop_pending_updates=True,
+        )
+        logger.info("Webhook set", url=settings.WEBHOOK_BASE_URL, path=settings.WEBHOOK_PATH)
+    finally:
+        await container.dispose()
+
+
+async def serve_webhook(worker_index: int = 0):
+    """Webhook worker; several of them share the port through SO_REUSEPORT."""
+    setup_logging()
+    # each process has its own registry, so each gets its own metrics port
+    metrics.start_metrics_server(settings.METRICS_PORT + worker_index)
+    container = Container()
+    dp = setup_dispatcher(container)
+
+    async def on_startup():
+        await container.start()
+
+    async def on_shutdown():
+        await container.dispose()
+
+    dp.startup.register(on_startup)
+    dp.shutdown.register(on_shutdown)
+
+    app = web.Application()
+    SimpleRequestHandler(
+        dispatcher=dp,
+        bot=container.bot,
+        # respond once the update is queued, so a full queue pushes back on Telegram
+        handle_in_background=False,
+        secret_token=settings.WEBHOOK_SECRET,
+    ).register(app, path=settings.WEBHOOK_PATH)
+    container.readiness.register(app)
+    setup_application(app, dp, bot=container.bot)
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(
+        runner,
+        host=settings.WEBHOOK_HOST,
+        port=settings.WEBHOOK_PORT,
+        reuse_port=settings.WEBHOOK_WORKERS > 1,
+    )
+    await site.start()
+    logger.info("Webhook worker started", host=settings.WEBHOOK_HOST, port=settings.WEBHOOK_PORT)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    try:
+        await stop.wait()
+    finally:
+        await runner.cleanup()
+
+
+def run_webhook_worker(worker_index: int = 0):
+    asyncio.run(serve_webhook(worker_index))
+
+
+def run_webhook():
+    asyncio.run(set_webhook())
+
+    # workers always get their own process: routers are module-level and can only be
+    # attached to one dispatcher, and set_webhook() has already used them here
+    ctx = multiprocessing.get_context("spawn")
+    workers = [
+        ctx.Process(target=run_webhook_worker, args=(i,), name=f"webhook-worker-{i}")
+        for i in range(settings.WEBHOOK_WORKERS)
+    ]
+    for worker in workers:
+        worker.start()
+
+    # make SIGTERM unwind through `finally` so workers are stopped too
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        for worker in workers:
+            worker.join()
+    finally:
+        for worker in workers:
+            if worker.is_alive():
+                worker.terminate()
+                worker.join()
+
+
+def main():
+    setup_logging()
+
+    if settings.BOT_MODE == "webhook":
+        run_webhook()
+    else:
+        asyncio.run(run_polling())
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    main()
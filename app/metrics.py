@@ -0,0 +1,134 @@
+"""
+Optional Prometheus metrics.
+
+Collected only with METRICS_ENABLED=true and the `metrics` extra installed
+(`prometheus-client`); otherwise every metric below is a no-op, so call sites
+never need to check whether metrics are on.
+"""
+
+from collections.abc import Callable, Sequence
+from contextlib import nullcontext
+from typing import Any
+
+from structlog import get_logger
+
+from app.config import settings
+
+try:
+    import prometheus_client
+except ImportError:
+    prometheus_client = None
+
+logger = get_logger()
+
+ENABLED = settings.METRICS_ENABLED and prometheus_client is not None
+
+# seconds; the hot path is expected to stay in the low milliseconds
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class _NoopMetric:
+    """Stands in for any metric (and its labelled children) when metrics are off."""
+
+    __slots__ = ()
+
+    def labels(self, *args: Any, **kwargs: Any) -> "_NoopMetric":
+        return self
+
+    def inc(self, amount: float = 1) -> None:
+        pass
+
+    def observe(self, amount: float) -> None:
+        pass
+
+    def set_function(self, f: Callable[[], float]) -> None:
+        pass
+
+    def time(self) -> nullcontext[None]:
+        return nullcontext()
+
+
+_NOOP = _NoopMetric()
+
+
+def _counter(name: str, documentation: str, labels: Sequence[str]) -> Any:
+    if not ENABLED:
+        return _NOOP
+    return prometheus_client.Counter(name, documentation, labels)
+
+
+def _histogram(name: str, documentation: str, labels: Sequence[str]) -> Any:
+    if not ENABLED:
+        return _NOOP
+    return prometheus_client.Histogram(name, documentation, labels, buckets=LATENCY_BUCKETS)
+
+
+def _gauge(name: str, documentation: str, labels: Sequence[str]) -> Any:
+    if not ENABLED:
+        return _NOOP
+    return prometheus_client.Gauge(name, documentation, labels)
+
+
+SUBSCRIPTION_MIDDLEWARE_SECONDS = _histogram(
+    "subscription_middleware_seconds",
+    "Time spent in SubscriptionMiddleware per group message, excluding handlers",
+    ["outcome"],  # passed, admin_bypass, blocked
+)
+SUBSCRIPTION_CACHE_LOOKUPS = _counter(
+    "subscription_cache_lookups_total",
+    "Subscription status lookups per cache tier",
+    ["tier", "result"],  # tier: l1 (in-process) or l2 (Redis sub:* keys); result: hit, miss
+)
+BOT_API_REQUESTS = _counter(
+    "bot_api_requests_total",
+    "Bot API requests sent, per method and outcome",
+    ["method", "outcome"],  # outcome: ok or the aiogram exception class
+)
+BOT_API_REQUEST_SECONDS = _histogram(
+    "bot_api_request_seconds",
+    "Bot API request latency per method, each attempt measured separately",
+    ["method"],
+)
+BOT_API_RETRIES = _counter(
+    "bot_api_retries_total",
+    "Bot API requests retried, per method and error",
+    ["method", "error"],
+)
+DB_QUERY_SECONDS = _histogram(
+    "db_query_seconds",
+    "Database query time per repository method",
+    ["query"],
+)
+FLOOD_LIMITED = _counter(
+    "flood_limited_total",
+    "Group messages deleted by the flood limiter",
+    ["source"],  # local: known to be blocked in-process, redis: decided by the script
+)
+LOG_EVENTS_DROPPED = _counter(
+    "log_events_dropped_total",
+    "Log events not written in full",
+    # rate_limit: over the per-event limit and not sampled; sampled: over the limit,
+    # written as one of LOG_SAMPLE_EVERY; queue_full
+    ["reason"],
+)
+BACKGROUND_TASKS = _gauge(
+    "background_tasks",
+    "Work waiting or running in the background",
+    ["kind"],
+)
+
+
+def track_background(kind: str, f: Callable[[], float]) -> None:
+    """Reports the value of `f` as the `background_tasks{kind=...}` gauge on every scrape."""
+    BACKGROUND_TASKS.labels(kind).set_function(f)
+
+
+def start_metrics_server(port: int) -> None:
+    """Serves /metrics on a local port from a background thread."""
+    if not settings.METRICS_ENABLED:
+        return
+    if prometheus_client is None:
+        logger.warning("METRICS_ENABLED is set but prometheus-client is not installed")
+        return
+    prometheus_client.start_http_server(port, addr=settings.METRICS_HOST)
+    logger.info("Metrics server started", host=settings.METRICS_HOST, port=port)
@@ -0,0 +1,33 @@
+from datetime import datetime
+
+from sqlalchemy import BigInteger, DateTime, ForeignKey, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.channel import Base
+
+
+class GroupChannel(Base):
+    """A channel that members of a group must be subscribed to."""
+
+    __tablename__ = "group_channels"
+    __table_args__ = (UniqueConstraint("group_id", "channel_id"),)
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    # the unique constraint's index serves lookups by group
+    group_id: Mapped[int] = mapped_column(BigInteger)
+    channel_id: Mapped[int] = mapped_column(
+        BigInteger, ForeignKey("channels.telegram_id", ondelete="CASCADE"), index=True
+    )
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+
+class ConfiguredGroup(Base):
+    """
+    A group that ever had a channel linked. Kept when its links are gone, so the
+    group then requires no channels instead of falling back to all of them.
+    """
+
+    __tablename__ = "configured_groups"
+
+    group_id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
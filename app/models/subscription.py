@@ -0,0 +1,23 @@
+from datetime import datetime
+
+from sqlalchemy import BigInteger, Boolean, DateTime
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.channel import Base
+
+
+class Subscription(Base):
+    """
+    Last verified membership of a user in a channel.
+
+    Durable copy of the Redis subscription cache, used to refill it after a flush.
+    No foreign key to channels: rows are written in bulk and a row of a channel
+    removed meanwhile must not fail the whole batch; such rows are simply unused.
+    """
+
+    __tablename__ = "subscriptions"
+
+    user_id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    channel_id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    is_subscribed: Mapped[bool] = mapped_column(Boolean)
+    verified_at: Mapped[datetime] = mapped_column(DateTime, index=True)  # UTC
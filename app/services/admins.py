@@ -0,0 +1,133 @@
+import asyncio
+import time
+
+from aiogram import Bot
+from redis.asyncio import Redis
+from structlog import get_logger
+
+from app import tracing
+
+ADMINS_TTL = 3600  # 1 hour, refreshed earlier by chat_member/my_chat_member updates
+LOCAL_ADMINS_TTL = 60
+GROUPS_KEY = "admins:groups"  # every group the bot has fetched admins for
+
+logger = get_logger()
+
+
+class GroupAdminCache:
+    """
+    Per-group administrator sets.
+
+    Each set is fetched once with get_chat_administrators and stored in Redis
+    (`admins:{chat_id}`, comma-separated user ids) plus an in-process copy, so the
+    admin bypass in SubscriptionMiddleware normally costs no network calls at all.
+    The local copy has a short TTL so changes seen by other instances propagate.
+    Groups are also recorded in a Redis set, so a restarted instance knows which
+    admin sets to prefetch.
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        bot: Bot,
+        ttl: int = ADMINS_TTL,
+        local_ttl: float = LOCAL_ADMINS_TTL,
+    ) -> None:
+        self._redis = redis
+        self._bot = bot
+        self.ttl = ttl
+        self.local_ttl = local_ttl
+
+        self._local: dict[int, tuple[frozenset[int], float]] = {}
+        self._inflight: dict[int, asyncio.Task[frozenset[int] | None]] = {}
+
+    @staticmethod
+    def key(chat_id: int) -> str:
+        return f"admins:{chat_id}"
+
+    async def is_admin(self, chat_id: int, user_id: int) -> bool:
+        return user_id in await self.get(chat_id)
+
+    async def get(self, chat_id: int) -> frozenset[int]:
+        entry = self._local.get(chat_id)
+        if entry is not None and entry[1] > time.monotonic():
+            return entry[0]
+
+        try:
+            with tracing.span("redis.admins_get"):
+                cached = await self._redis.get(self.key(chat_id))
+        except Exception:
+            # redis failure not critical, fall back to the Bot API
+            cached = None
+
+        if cached is not None:
+            admins = frozenset(int(uid) for uid in cached.split(",") if uid)
+            self._remember(chat_id, admins)
+            return admins
+
+        admins = await self._fetch_once(chat_id)
+        return admins if admins is not None else frozenset()
+
+    async def refresh(self, chat_id: int) -> None:
+        """Drops cached admins of the group and fetches them again."""
+        await self.invalidate(chat_id)
+        await self._fetch_once(chat_id)
+
+    async def known_groups(self) -> list[int]:
+        return [int(chat_id) for chat_id in await self._redis.smembers(GROUPS_KEY)]
+
+    async def prefetch(self, chat_ids: list[int], concurrency: int = 10) -> None:
+        """Loads admin sets into the in-process cache, fetching missing ones."""
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def load(chat_id: int) -> None:
+            async with semaphore:
+                await self.get(chat_id)
+
+        await asyncio.gather(*(load(chat_id) for chat_id in chat_ids))
+
+    async def forget(self, chat_id: int) -> None:
+        """Drops the group entirely, e.g. after the bot left it."""
+        await self.invalidate(chat_id)
+        try:
+            await self._redis.srem(GROUPS_KEY, chat_id)
+        except Exception as e:
+            logger.warning("Failed to forget group", chat_id=chat_id, error=str(e))
+
+    async def invalidate(self, chat_id: int) -> None:
+        self._local.pop(chat_id, None)
+        try:
+            await self._redis.delete(self.key(chat_id))
+        except Exception as e:
+            logger.warning("Failed to invalidate group admins", chat_id=chat_id, error=str(e))
+
+    async def _fetch_once(self, chat_id: int) -> frozenset[int] | None:
+        # concurrent misses for the same group share one get_chat_administrators call
+        task = self._inflight.get(chat_id)
+        if task is None:
+            task = asyncio.create_task(self._fetch(chat_id))
+            self._inflight[chat_id] = task
+            task.add_done_callback(lambda _: self._inflight.pop(chat_id, None))
+        return await asyncio.shield(task)
+
+    async def _fetch(self, chat_id: int) -> frozenset[int] | None:
+        try:
+            members = await self._bot.get_chat_administrators(chat_id)
+        except Exception as e:
+            logger.warning("Failed to fetch group admins", chat_id=chat_id, error=str(e))
+            return None
+
+        admins = frozenset(member.user.id for member in members)
+        self._remember(chat_id, admins)
+        try:
+            with tracing.span("redis.admins_set"):
+                async with self._redis.pipeline(transaction=False) as pipe:
+                    pipe.setex(self.key(chat_id), self.ttl, ",".join(map(str, admins)))
+                    pipe.sadd(GROUPS_KEY, chat_id)
+                    await pipe.execute()
+        except Exception:
+            pass
+        return admins
+
+    def _remember(self, chat_id: int, admins: frozenset[int]) -> None:
+        self._local[chat_id] = (admins, time.monotonic() + self.local_ttl)
@@ -0,0 +1,179 @@
+import asyncio
+from collections.abc import Callable, Mapping
+from contextlib import AbstractAsyncContextManager
+from dataclasses import dataclass
+
+from redis.asyncio import Redis
+from sqlalchemy.ext.asyncio import AsyncSession
+from structlog import get_logger
+
+from app.models.channel import Channel
+from app.storage.repositories.channels import ChannelRepository
+from app.storage.repositories.group_channels import GroupChannelRepository
+
+VERSION_KEY = "channels:version"
+
+logger = get_logger()
+
+
+@dataclass(frozen=True, slots=True)
+class ChannelRecord:
+    """Compact, immutable copy of a Channel row used on the message hot path."""
+
+    telegram_id: int
+    title: str
+    invite_link: str | None
+
+    @classmethod
+    def from_model(cls, channel: Channel) -> "ChannelRecord":
+        return cls(
+            telegram_id=channel.telegram_id,
+            title=channel.title,
+            invite_link=channel.invite_link,
+        )
+
+
+class ChannelRegistry:
+    """
+    In-process snapshot of registered channels.
+
+    The snapshot is an immutable tuple replaced as a whole on reload, so readers
+    never hit the database and never need a lock. Every change to the channels table
+    bumps a version counter in Redis; other bot instances poll it and reload.
+
+    Channels required in a group are indexed by chat id, so a lookup costs the same
+    however many channels are registered. Groups that never had a channel linked
+    require every channel when `fallback_all` is set, and none otherwise; a group
+    whose linked channels are all gone requires none.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], AbstractAsyncContextManager[AsyncSession]],
+        redis: Redis,
+        poll_interval: float = 5.0,
+        fallback_all: bool = True,
+    ) -> None:
+        self._session_factory = session_factory
+        self._redis = redis
+        self._poll_interval = poll_interval
+        self._fallback_all = fallback_all
+
+        self._channels: tuple[ChannelRecord, ...] = ()
+        self._by_id: dict[int, ChannelRecord] = {}
+        self._by_group: dict[int, tuple[ChannelRecord, ...]] = {}
+        self._version: int | None = None
+
+        self._lock = asyncio.Lock()
+        self._watcher: asyncio.Task[None] | None = None
+
+    @property
+    def channels(self) -> tuple[ChannelRecord, ...]:
+        return self._channels
+
+    @property
+    def version(self) -> int | None:
+        return self._version
+
+    def get(self, telegram_id: int) -> ChannelRecord | None:
+        return self._by_id.get(telegram_id)
+
+    def channels_for(self, chat_id: int) -> tuple[ChannelRecord, ...]:
+        """Channels members of the group must be subscribed to."""
+        channels = self._by_group.get(chat_id)
+        if channels is not None:
+            return channels
+        return self._channels if self._fallback_all else ()
+
+    @property
+    def groups(self) -> Mapping[int, tuple[ChannelRecord, ...]]:
+        """Configured groups with their linked channels, possibly none."""
+        return self._by_group
+
+    async def load(self) -> None:
+        """Load the snapshot from the database."""
+        async with self._lock:
+            version = await self._read_version()
+            async with self._session_factory() as session:
+                channels = await ChannelRepository(session).get_all_channels()
+                group_repo = GroupChannelRepository(session)
+                links = await group_repo.get_all_links()
+                groups = await group_repo.get_configured_groups()
+            self._set_snapshot(channels, links, groups, version)
+
+    async def refresh(self, session: AsyncSession) -> None:
+        """
+        Rebuild the snapshot after channels or group links were changed by this
+        instance and notify other instances through the version counter.
+        """
+        async with self._lock:
+            try:
+                version: int | None = await self._redis.incr(VERSION_KEY)
+            except Exception as e:
+                logger.warning("Failed to bump channels version", error=str(e))
+                version = None
+            channels = await ChannelRepository(session).get_all_channels()
+            group_repo = GroupChannelRepository(session)
+            links = await group_repo.get_all_links()
+            groups = await group_repo.get_configured_groups()
+            self._set_snapshot(channels, links, groups, version)
+
+    def start(self) -> None:
+        if self._watcher is None:
+            self._watcher = asyncio.create_task(self._watch())
+
+    async def stop(self) -> None:
+        if self._watcher is not None:
+            self._watcher.cancel()
+            try:
+                await self._watcher
+            except asyncio.CancelledError:
+                pass
+            self._watcher = None
+
+    async def _watch(self) -> None:
+        while True:
+            await asyncio.sleep(self._poll_interval)
+            try:
+                version = await self._read_version()
+                if version is not None and version != self._version:
+                    logger.info("Channels version changed, reloading", version=version)
+                    await self.load()
+            except Exception as e:
+                logger.warning("Failed to reload channel registry", error=str(e))
+
+    async def _read_version(self) -> int | None:
+        try:
+            value = await self._redis.get(VERSION_KEY)
+        except Exception as e:
+            logger.warning("Failed to read channels version", error=str(e))
+            return None
+        return int(value) if value is not None else 0
+
+    def _set_snapshot(
+        self,
+        channels: list[Channel],
+        links: list[tuple[int, int]],
+        groups: list[int],
+        version: int | None,
+    ) -> None:
+        records = tuple(ChannelRecord.from_model(channel) for channel in channels)
+        by_id = {record.telegram_id: record for record in records}
+
+        grouped: dict[int, list[ChannelRecord]] = {group_id: [] for group_id in groups}
+        for group_id, channel_id in links:
+            record = by_id.get(channel_id)
+            if record is not None:
+                grouped.setdefault(group_id, []).append(record)
+
+        self._by_id = by_id
+        self._channels = records
+        self._by_group = {group_id: tuple(group) for group_id, group in grouped.items()}
+        if version is not None:
+            self._version = version
+        logger.info(
+            "Channel registry loaded",
+            channels=len(records),
+            groups=len(self._by_group),
+            version=self._version,
+        )
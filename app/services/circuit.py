@@ -0,0 +1,113 @@
+import time
+from collections import Counter, deque
+from enum import StrEnum
+
+from structlog import get_logger
+
+logger = get_logger()
+
+
+class CircuitState(StrEnum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker over a sliding window of recent calls.
+
+    Trips to OPEN when, over at least `min_calls` recent calls, the share of failed
+    calls reaches `failure_rate` or the share of calls slower than
+    `slow_call_duration` reaches `slow_call_rate`. After `open_duration` it lets
+    up to `half_open_calls` probes through; if they all succeed it closes again,
+    otherwise it re-opens.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        window: int = 50,
+        min_calls: int = 10,
+        failure_rate: float = 0.5,
+        slow_call_duration: float = 2.0,
+        slow_call_rate: float = 0.5,
+        open_duration: float = 30.0,
+        half_open_calls: int = 3,
+    ) -> None:
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_duration = slow_call_duration
+        self.slow_call_rate = slow_call_rate
+        self.open_duration = open_duration
+        self.half_open_calls = half_open_calls
+
+        self._state = CircuitState.CLOSED
+        self._calls: deque[tuple[bool, bool]] = deque(maxlen=window)  # (failed, slow)
+        self._opened_at = 0.0
+        self._probes_started = 0
+        self._probes_succeeded = 0
+        self.counters: Counter[str] = Counter()
+
+    @property
+    def state(self) -> CircuitState:
+        if self._state == CircuitState.OPEN and self._open_elapsed():
+            self._transition(CircuitState.HALF_OPEN)
+        return self._state
+
+    @property
+    def is_open(self) -> bool:
+        return self.state == CircuitState.OPEN
+
+    def allow_request(self) -> bool:
+        state = self.state
+        if state == CircuitState.CLOSED:
+            return True
+        if state == CircuitState.HALF_OPEN and self._probes_started < self.half_open_calls:
+            self._probes_started += 1
+            return True
+        self.counters["rejected"] += 1
+        return False
+
+    def record(self, success: bool, duration: float) -> None:
+        slow = duration >= self.slow_call_duration
+        if self._state == CircuitState.HALF_OPEN:
+            if not success or slow:
+                self._transition(CircuitState.OPEN)
+                return
+            self._probes_succeeded += 1
+            if self._probes_succeeded >= self.half_open_calls:
+                self._transition(CircuitState.CLOSED)
+            return
+
+        if self._state == CircuitState.OPEN:
+            # late result of a call started before the circuit opened
+            return
+
+        self._calls.append((not success, slow))
+        if len(self._calls) < self.min_calls:
+            return
+        failures = sum(1 for failed, _ in self._calls if failed)
+        slow_calls = sum(1 for _, is_slow in self._calls if is_slow)
+        if (
+            failures / len(self._calls) >= self.failure_rate
+            or slow_calls / len(self._calls) >= self.slow_call_rate
+        ):
+            self._transition(CircuitState.OPEN)
+
+    def _open_elapsed(self) -> bool:
+        return time.monotonic() - self._opened_at >= self.open_duration
+
+    def _transition(self, state: CircuitState) -> None:
+        logger.warning(
+            "Circuit breaker state changed", breaker=self.name, old=self._state, new=state
+        )
+        self.counters[f"to_{state}"] += 1
+        self._state = state
+        self._probes_started = 0
+        self._probes_succeeded = 0
+        if state == CircuitState.OPEN:
+            self._opened_at = time.monotonic()
+        elif state == CircuitState.CLOSED:
+            self._calls.clear()
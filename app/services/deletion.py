@@ -0,0 +1,125 @@
+import asyncio
+import time
+from collections import defaultdict
+
+from aiogram import Bot
+from redis.asyncio import Redis
+from structlog import get_logger
+
+from app import tracing
+
+QUEUE_KEY = "delete:queue"
+BATCH_LIMIT = 100  # deleteMessages accepts up to 100 ids per call
+CLAIM_LIMIT = 1000
+
+# Atomically pop due members, so several bot instances never delete the same message twice
+CLAIM_DUE_SCRIPT = """
+local items = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[2])
+if #items > 0 then
+    redis.call('ZREM', KEYS[1], unpack(items))
+end
+return items
+"""
+
+logger = get_logger()
+
+
+class DeletionScheduler:
+    """
+    Persistent queue of messages to delete later (e.g. subscription warnings).
+
+    Messages live in a Redis sorted set scored by due time, so they survive
+    restarts. A single loop wakes once per tick, claims everything that is due and
+    deletes it with one deleteMessages call per chat.
+    """
+
+    def __init__(self, redis: Redis, bot: Bot, tick: float = 1.0) -> None:
+        self._redis = redis
+        self._bot = bot
+        self._tick = tick
+        self._claim_due = redis.register_script(CLAIM_DUE_SCRIPT)
+        self._task: asyncio.Task[None] | None = None
+
+    async def schedule(self, chat_id: int, message_id: int, delay: float) -> None:
+        with tracing.span("redis.delete_schedule"):
+            await self._redis.zadd(QUEUE_KEY, {f"{chat_id}:{message_id}": time.time() + delay})
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stops the loop and deletes whatever is already due; the rest stays queued."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+        try:
+            await self.process_due()
+        except Exception as e:
+            logger.warning("Failed to drain deletion queue", error=str(e))
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.process_due()
+            except Exception as e:
+                logger.warning("Deletion queue tick failed", error=str(e))
+            await asyncio.sleep(self._tick)
+
+    async def process_due(self) -> int:
+        """Deletes all due messages. Returns the number of claimed messages."""
+        claimed = 0
+        while True:
+            items = await self._claim_due(keys=[QUEUE_KEY], args=[time.time(), CLAIM_LIMIT])
+            if not items:
+                return claimed
+            claimed += len(items)
+
+            by_chat: dict[int, list[int]] = defaultdict(list)
+            for item in items:
+                chat_id, message_id = item.rsplit(":", 1)
+                by_chat[int(chat_id)].append(int(message_id))
+
+            try:
+                await asyncio.gather(
+                    *(self._delete(chat_id, ids) for chat_id, ids in by_chat.items())
+                )
+            except asyncio.CancelledError:
+                # stopped mid-batch: the claimed messages are no longer in the queue
+                await self._requeue(by_chat)
+                raise
+            if len(items) < CLAIM_LIMIT:
+                return claimed
+
+    async def _delete(self, chat_id: int, message_ids: list[int]) -> None:
+        """Deletes the messages in batches, removing each batch from the list once done."""
+        while message_ids:
+            batch = message_ids[:BATCH_LIMIT]
+            try:
+                await self._bot.delete_messages(chat_id, batch)
+            except Exception as e:
+                logger.warning(
+                    "Failed to delete messages", chat_id=chat_id, count=len(batch), error=str(e)
+                )
+            del message_ids[:BATCH_LIMIT]
+
+    async def _requeue(self, by_chat: dict[int, list[int]]) -> None:
+        """Puts messages back as due right away."""
+        now = time.time()
+        items = {
+            f"{chat_id}:{message_id}": now
+            for chat_id, message_ids in by_chat.items()
+            for message_id in message_ids
+        }
+        if not items:
+            return
+        try:
+            await self._redis.zadd(QUEUE_KEY, items)
+        except Exception as e:
+            logger.warning("Failed to requeue messages", count=len(items), error=str(e))
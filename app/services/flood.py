@@ -0,0 +1,68 @@
+import time
+
+from redis.asyncio import Redis
+
+from app import tracing
+from app.storage.cache.local import LocalTTLCache
+
+FLOOD_LIMIT = 10
+FLOOD_WINDOW = 10.0
+LOCAL_MAX_ENTRIES = 100_000
+
+# Sliding window log: one sorted-set member per accepted message, scored by time.
+# Returns {1, 0} if the message fits, or {0, ms until the oldest one leaves the window}.
+HIT_SCRIPT = """
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local limit = tonumber(ARGV[3])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - window)
+if redis.call('ZCARD', KEYS[1]) >= limit then
+    local oldest = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+    return {0, math.ceil((tonumber(oldest[2]) + window - now) * 1000)}
+end
+redis.call('ZADD', KEYS[1], now, ARGV[4])
+redis.call('PEXPIRE', KEYS[1], math.ceil(window * 1000))
+return {1, 0}
+"""
+
+
+class FloodLimiter:
+    """
+    At most `limit` messages per (chat, user) within a sliding `window` (seconds).
+
+    The window is kept in Redis and updated atomically by a Lua script, so it holds
+    across bot instances. Once a user is over the limit, the instance remembers
+    until when and rejects further messages locally, without a Redis round-trip.
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        limit: int = FLOOD_LIMIT,
+        window: float = FLOOD_WINDOW,
+        local_max_entries: int = LOCAL_MAX_ENTRIES,
+    ) -> None:
+        self.limit = limit
+        self.window = window
+        self._hit = redis.register_script(HIT_SCRIPT)
+        self._blocked: LocalTTLCache[tuple[int, int], bool] = LocalTTLCache(local_max_entries)
+
+    @staticmethod
+    def key(chat_id: int, user_id: int) -> str:
+        return f"flood:{chat_id}:{user_id}"
+
+    def is_blocked(self, chat_id: int, user_id: int) -> bool:
+        """In-process check: True if this user is known to be over the limit."""
+        return self._blocked.get((chat_id, user_id)) is not None
+
+    async def hit(self, chat_id: int, user_id: int, message_id: int) -> bool:
+        """Counts a message; returns False if it is over the limit."""
+        with tracing.span("redis.flood_hit"):
+            allowed, retry_after_ms = await self._hit(
+                keys=[self.key(chat_id, user_id)],
+                args=[time.time(), self.window, self.limit, message_id],
+            )
+        if allowed:
+            return True
+        self._blocked.set((chat_id, user_id), True, int(retry_after_ms) / 1000)
+        return False
@@ -0,0 +1,53 @@
+from pathlib import Path
+
+from aiohttp import web
+from structlog import get_logger
+
+logger = get_logger()
+
+
+class Readiness:
+    """
+    Tells an orchestrator whether the bot is ready to take traffic.
+
+    Exposed as a file that exists only while the bot is ready, and over HTTP:
+    GET /readyz answers 200 when ready and 503 otherwise (during warm-up and
+    shutdown), GET /healthz answers 200 as long as the process runs.
+    """
+
+    def __init__(self, path: str | None = None) -> None:
+        self._path = Path(path) if path else None
+        # a file left by a killed process must not pass the healthcheck during warm-up
+        self.set_not_ready()
+
+    def set_ready(self) -> None:
+        self.ready = True
+        if self._path is not None:
+            self._path.touch()
+        logger.info("Bot is ready")
+
+    def set_not_ready(self) -> None:
+        self.ready = False
+        if self._path is not None:
+            self._path.unlink(missing_ok=True)
+
+    def register(self, app: web.Application) -> None:
+        app.router.add_get("/healthz", self._healthz)
+        app.router.add_get("/readyz", self._readyz)
+
+    async def serve(self, host: str, port: int) -> web.AppRunner:
+        """Starts a standalone health server; the caller cleans the runner up."""
+        app = web.Application()
+        self.register(app)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, host=host, port=port).start()
+        return runner
+
+    async def _healthz(self, request: web.Request) -> web.Response:
+        return web.Response(text="ok")
+
+    async def _readyz(self, request: web.Request) -> web.Response:
+        if self.ready:
+            return web.Response(text="ready")
+        return web.Response(status=503, text="not ready")
@@ -1,64 +1,267 @@
+import asyncio
+import time
+from collections import Counter
 from collections.abc import Sequence
+from typing import Literal
 
 from aiogram import Bot
 from aiogram.enums import ChatMemberStatus
-from redis.asyncio import Redis
 from structlog import get_logger
 
-from app.models.channel import Channel
+from app.services.channel_registry import ChannelRecord
+from app.services.circuit import CircuitBreaker
+from app.storage.cache.subscriptions import CACHE_TTL, CachedStatus, SubscriptionCache
+from app.storage.cache.tiered import TieredSubscriptionCache
 
-CACHE_TTL = 300  # 5 minutes
+LOCK_POLL_INTERVAL = 0.05
+# channel member statuses that count as subscribed, whether seen in an update or fetched
+SUBSCRIBED_STATUSES = (
+    ChatMemberStatus.CREATOR,
+    ChatMemberStatus.ADMINISTRATOR,
+    ChatMemberStatus.MEMBER,
+)
+
+# What to do when membership cannot be confirmed (API errors, open circuit):
+# "closed" treats the channel as missing, "open" lets the message through
+FailurePolicy = Literal["open", "closed"]
 
 logger = get_logger()
 
 
 class SubscriptionService:
-    def __init__(self, redis: Redis, bot: Bot):
-        self.redis = redis
+    def __init__(
+        self,
+        cache: SubscriptionCache | TieredSubscriptionCache,
+        bot: Bot,
+        *,
+        concurrency: int = 8,
+        check_timeout: float = 5.0,
+        redis_lock: bool = False,
+        cache_ttl: float = CACHE_TTL,
+        refresh_ahead: float = 0.0,
+        stale_grace: float = 0.0,
+        breaker: CircuitBreaker | None = None,
+        failure_policy: FailurePolicy = "closed",
+    ):
+        self.cache = cache
         self.bot = bot
+        self.concurrency = concurrency
+        self.check_timeout = check_timeout
+        self.redis_lock = redis_lock
+        self.cache_ttl = cache_ttl
+        self.refresh_ahead = refresh_ahead
+        self.stale_grace = stale_grace
+        self.breaker = breaker or CircuitBreaker("get_chat_member")
+        self.failure_policy = failure_policy
+        self.counters: Counter[str] = Counter()
+
+        self._inflight: dict[tuple[int, int], asyncio.Future[bool | None]] = {}
+        self._background: set[asyncio.Task[dict[int, bool | None]]] = set()
 
     async def check_user_subscription(
-        self, user_id: int, channels: Sequence[Channel]
-    ) -> list[Channel]:
+        self, user_id: int, channels: Sequence[ChannelRecord]
+    ) -> list[ChannelRecord]:
         """
         Returns a list of channels the user is NOT subscribed to.
+        Channels are checked concurrently; the result keeps the order of `channels`.
+        """
+        if not channels:
+            return []
+
+        #  Check Redis (one round-trip for all channels)
+        try:
+            cached = await self.cache.get_many(user_id, [ch.telegram_id for ch in channels])
+        except Exception:
+            # redis failure not critical, continue to API check
+            cached = {}
+
+        known, to_refresh = self._usable_statuses(channels, cached)
+        if to_refresh:
+            # let the message through on the still-valid value, revalidate in background
+            self._revalidate(user_id, to_refresh)
+
+        to_check = [ch for ch in channels if ch.telegram_id not in known]
+        if to_check:
+            statuses = await self._check_channels(user_id, to_check)
+            known |= {cid: status for cid, status in statuses.items() if status is not None}
+
+        unknown = [ch for ch in channels if ch.telegram_id not in known]
+        if unknown:
+            # the Bot API failed or the circuit is open: apply the deployment policy
+            self.counters[f"failed_{self.failure_policy}"] += len(unknown)
+            if self.failure_policy == "open":
+                return [ch for ch in channels if known.get(ch.telegram_id) is False]
+
+        return [ch for ch in channels if not known.get(ch.telegram_id)]
+
+    def _usable_statuses(
+        self, channels: Sequence[ChannelRecord], cached: dict[int, CachedStatus]
+    ) -> tuple[dict[int, bool], list[ChannelRecord]]:
+        """
+        Splits cached entries into usable statuses and channels to revalidate.
+
+        Positive entries are refreshed ahead once they are within `refresh_ahead`
+        of `cache_ttl`, and still accepted for `stale_grace` after it. Negative
+        entries have their own short TTL and are used as is. While the circuit is
+        open, whatever is still cached is served regardless of age.
         """
-        missing_channels = []
+        now = time.time()
+        max_age = float("inf") if self.breaker.is_open else self.cache_ttl + self.stale_grace
+        usable: dict[int, bool] = {}
+        to_refresh: list[ChannelRecord] = []
+        for channel in channels:
+            status = cached.get(channel.telegram_id)
+            if status is None:
+                continue
+            if not status.is_subscribed:
+                usable[channel.telegram_id] = False
+                continue
+
+            age = now - status.verified_at
+            if age >= max_age:
+                continue
+            usable[channel.telegram_id] = True
+            if age >= self.cache_ttl - self.refresh_ahead:
+                to_refresh.append(channel)
+        return usable, to_refresh
+
+    def _revalidate(self, user_id: int, channels: Sequence[ChannelRecord]) -> None:
+        channels = [ch for ch in channels if (user_id, ch.telegram_id) not in self._inflight]
+        if not channels:
+            return
+        task = asyncio.create_task(self._check_channels(user_id, channels))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    @property
+    def pending(self) -> int:
+        """Background revalidations still running."""
+        return len(self._background)
 
+    async def stop(self) -> None:
+        """Cancels background revalidations."""
+        tasks = list(self._background)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _check_channels(
+        self, user_id: int, channels: Sequence[ChannelRecord]
+    ) -> dict[int, bool | None]:
+        """
+        Single-flight wrapper: concurrent checks of the same (user, channel) pair,
+        e.g. from a burst of messages or an album, share one in-flight request.
+        """
+        loop = asyncio.get_running_loop()
+        owned: list[ChannelRecord] = []
+        joined: dict[int, asyncio.Future[bool | None]] = {}
         for channel in channels:
-            is_subscribed = await self._check_single_channel(user_id, channel)
-            if not is_subscribed:
-                missing_channels.append(channel)
+            key = (user_id, channel.telegram_id)
+            future = self._inflight.get(key)
+            if future is None:
+                self._inflight[key] = loop.create_future()
+                owned.append(channel)
+            else:
+                joined[channel.telegram_id] = future
+
+        statuses: dict[int, bool | None] = {}
+        try:
+            if owned:
+                statuses = await self._fetch_and_cache(user_id, owned)
+        finally:
+            # results are already cached at this point, so late arrivals hit Redis
+            for channel in owned:
+                future = self._inflight.pop((user_id, channel.telegram_id))
+                future.set_result(statuses.get(channel.telegram_id))
 
-        return missing_channels
+        for channel_id, future in joined.items():
+            statuses[channel_id] = await asyncio.shield(future)
+        return statuses
 
-    async def _check_single_channel(self, user_id: int, channel: Channel) -> bool:
-        cache_key = f"sub:{user_id}:{channel.telegram_id}"
+    async def _fetch_and_cache(
+        self, user_id: int, channels: Sequence[ChannelRecord]
+    ) -> dict[int, bool | None]:
+        statuses: dict[int, bool | None] = {}
+        locked: list[int] = []
+
+        if self.redis_lock:
+            # Cross-instance single-flight: only the lock holder asks the Bot API,
+            # other instances wait for its result to appear in the cache.
+            channel_ids = [ch.telegram_id for ch in channels]
+            try:
+                locked = await self.cache.acquire_locks(user_id, channel_ids, self.check_timeout)
+            except Exception:
+                locked = channel_ids
+
+            foreign = [cid for cid in channel_ids if cid not in locked]
+            if foreign:
+                statuses.update(await self._wait_for_cache(user_id, foreign))
+            channels = [ch for ch in channels if ch.telegram_id not in statuses]
+
+        #  Check Telegram API
+        fetched = await self._fetch_statuses(user_id, channels)
+        statuses.update(fetched)
 
-        #  Check Redis
+        # Cache confirmed results (one pipelined round-trip); errors are not cached
         try:
-            cached_status = await self.redis.get(cache_key)
-            if cached_status == "1":
-                return True
+            await self.cache.set_many(
+                user_id, {cid: status for cid, status in fetched.items() if status is not None}
+            )
+            if locked:
+                await self.cache.release_locks(user_id, locked)
         except Exception:
-            # redis failure not critical, continue to API check
             pass
 
-        #  Check Telegram API
-        try:
-            member = await self.bot.get_chat_member(chat_id=channel.telegram_id, user_id=user_id)
-            if member.status in (
-                ChatMemberStatus.CREATOR,
-                ChatMemberStatus.ADMINISTRATOR,
-                ChatMemberStatus.MEMBER,
-            ):
-                # Cache successful subscription
+        return statuses
+
+    async def _wait_for_cache(self, user_id: int, channel_ids: list[int]) -> dict[int, bool]:
+        """Polls the cache for results of checks another instance is running."""
+        deadline = asyncio.get_running_loop().time() + self.check_timeout
+        found: dict[int, bool] = {}
+        pending = list(channel_ids)
+        while pending and asyncio.get_running_loop().time() < deadline:
+            await asyncio.sleep(LOCK_POLL_INTERVAL)
+            try:
+                cached = await self.cache.get_many(user_id, pending)
+            except Exception:
+                break
+            found.update({cid: status.is_subscribed for cid, status in cached.items()})
+            pending = [cid for cid in pending if cid not in found]
+        return found
+
+    async def _fetch_statuses(
+        self, user_id: int, channels: Sequence[ChannelRecord]
+    ) -> dict[int, bool | None]:
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def check(channel: ChannelRecord) -> bool | None:
+            if not self.breaker.allow_request():
+                return None
+
+            # outcomes are recorded per API attempt by BreakerRequestMiddleware,
+            # below the rate limiter, so our own queueing is not blamed on the API
+            async with semaphore:
                 try:
-                    await self.redis.setex(cache_key, CACHE_TTL, "1")
-                except Exception:
-                    pass
-                return True
-        except Exception as e:
-            logger.warning("Error", error=str(e))
-
-        return False
+                    return await asyncio.wait_for(
+                        self._check_single_channel(user_id, channel), self.check_timeout
+                    )
+                except TimeoutError:
+                    logger.warning(
+                        "Subscription check timed out",
+                        user_id=user_id,
+                        channel_id=channel.telegram_id,
+                    )
+                except Exception as e:
+                    logger.warning("Error", error=str(e))
+                return None
+
+        results = await asyncio.gather(*(check(channel) for channel in channels))
+        return {
+            channel.telegram_id: is_subscribed
+            for channel, is_subscribed in zip(channels, results, strict=True)
+        }
+
+    async def _check_single_channel(self, user_id: int, channel: ChannelRecord) -> bool | None:
+        """Returns membership as reported by the Bot API."""
+        member = await self.bot.get_chat_member(chat_id=channel.telegram_id, user_id=user_id)
+        return member.status in SUBSCRIBED_STATUSES
@@ -0,0 +1,121 @@
+import asyncio
+import time
+from collections.abc import Callable
+from contextlib import AbstractAsyncContextManager
+
+from aiogram import Bot
+from aiogram.enums import ChatMemberStatus
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
+from redis.asyncio import Redis
+from sqlalchemy.ext.asyncio import AsyncSession
+from structlog import get_logger
+
+from app.services.admins import GroupAdminCache
+from app.services.channel_registry import ChannelRecord, ChannelRegistry
+from app.storage.repositories.channels import ChannelRepository
+
+# one instance per deploy verifies channels, the others skip it
+VERIFY_LOCK_KEY = "warmup:channels"
+VERIFY_LOCK_TTL = 60
+ADMIN_STATUSES = (ChatMemberStatus.CREATOR, ChatMemberStatus.ADMINISTRATOR)
+
+logger = get_logger()
+
+
+class WarmUp:
+    """
+    Prepares in-process state before the bot takes traffic.
+
+    Loads the channel registry, drops channels where the bot is no longer an
+    admin (they could never be checked and would block every message), and
+    prefetches admin sets of known groups, so the first wave of messages after a
+    deploy does not turn into a burst of Bot API calls.
+    """
+
+    def __init__(
+        self,
+        bot: Bot,
+        redis: Redis,
+        session_factory: Callable[[], AbstractAsyncContextManager[AsyncSession]],
+        channel_registry: ChannelRegistry,
+        group_admins: GroupAdminCache,
+        concurrency: int = 10,
+    ) -> None:
+        self._bot = bot
+        self._redis = redis
+        self._session_factory = session_factory
+        self._channel_registry = channel_registry
+        self._group_admins = group_admins
+        self._concurrency = concurrency
+
+    async def run(self) -> None:
+        started = time.monotonic()
+        await self._channel_registry.load()
+        pruned = await self._verify_channels()
+        groups = await self._prefetch_admins()
+        logger.info(
+            "Warm-up finished",
+            duration=round(time.monotonic() - started, 3),
+            channels=len(self._channel_registry.channels),
+            pruned_channels=pruned,
+            groups=groups,
+        )
+
+    async def _verify_channels(self) -> int:
+        channels = self._channel_registry.channels
+        if not channels:
+            return 0
+        try:
+            if not await self._redis.set(VERIFY_LOCK_KEY, "1", nx=True, ex=VERIFY_LOCK_TTL):
+                return 0
+        except Exception as e:
+            logger.warning("Failed to take channel verification lock", error=str(e))
+
+        semaphore = asyncio.Semaphore(self._concurrency)
+        results = await asyncio.gather(*(self._is_admin(ch, semaphore) for ch in channels))
+        dead = [ch for ch, is_admin in zip(channels, results, strict=True) if is_admin is False]
+        if not dead:
+            return 0
+
+        async with self._session_factory() as session:
+            repo = ChannelRepository(session)
+            for channel in dead:
+                logger.warning(
+                    "Bot is no longer admin in channel, removing it",
+                    chat_id=channel.telegram_id,
+                    title=channel.title,
+                )
+                await repo.delete_channel(channel.telegram_id)
+            await self._channel_registry.refresh(session)
+        return len(dead)
+
+    async def _is_admin(self, channel: ChannelRecord, semaphore: asyncio.Semaphore) -> bool | None:
+        """None if it could not be determined, such channels are kept."""
+        async with semaphore:
+            try:
+                member = await self._bot.get_chat_member(channel.telegram_id, self._bot.id)
+            except TelegramForbiddenError:
+                # the bot was removed from the channel
+                return False
+            except TelegramBadRequest as e:
+                # may be temporary; pruning also drops the channel's group links
+                logger.warning(
+                    "Channel check rejected, keeping it", chat_id=channel.telegram_id, error=str(e)
+                )
+                return None
+            except Exception as e:
+                logger.warning(
+                    "Failed to verify channel", chat_id=channel.telegram_id, error=str(e)
+                )
+                return None
+        return member.status in ADMIN_STATUSES
+
+    async def _prefetch_admins(self) -> int:
+        try:
+            groups = set(await self._group_admins.known_groups())
+        except Exception as e:
+            logger.warning("Failed to read known groups", error=str(e))
+            groups = set()
+        groups.update(self._channel_registry.groups)
+        await self._group_admins.prefetch(list(groups), self._concurrency)
+        return len(groups)
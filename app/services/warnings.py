@@ -0,0 +1,53 @@
+from redis.asyncio import Redis
+
+from app import tracing
+
+WARNING_WINDOW = 10.0
+
+
+class WarningDebouncer:
+    """
+    Per-(chat, user) debounce window for subscription warnings.
+
+    The first offending message in a window claims `warn:{chat_id}:{user_id}` and
+    sends the warning; later messages in the same window are only deleted.
+    The key also remembers the warning's message id and the set of missing
+    channels it shows, so the warning can be edited in place when that set changes.
+    """
+
+    def __init__(self, redis: Redis, window: float = WARNING_WINDOW) -> None:
+        self._redis = redis
+        self.window = window
+
+    @staticmethod
+    def key(chat_id: int, user_id: int) -> str:
+        return f"warn:{chat_id}:{user_id}"
+
+    async def claim(self, chat_id: int, user_id: int) -> bool:
+        """Returns True if the caller should send a warning."""
+        with tracing.span("redis.warn_claim"):
+            return bool(
+                await self._redis.set(
+                    self.key(chat_id, user_id), "", nx=True, px=int(self.window * 1000)
+                )
+            )
+
+    async def release(self, chat_id: int, user_id: int) -> None:
+        """Gives the window up, e.g. when sending the warning failed."""
+        with tracing.span("redis.warn_release"):
+            await self._redis.delete(self.key(chat_id, user_id))
+
+    async def remember(self, chat_id: int, user_id: int, message_id: int, signature: str) -> None:
+        with tracing.span("redis.warn_remember"):
+            await self._redis.set(
+                self.key(chat_id, user_id), f"{message_id}:{signature}", xx=True, keepttl=True
+            )
+
+    async def get(self, chat_id: int, user_id: int) -> tuple[int, str] | None:
+        """Returns (message_id, signature) of the warning sent in the current window."""
+        with tracing.span("redis.warn_get"):
+            value = await self._redis.get(self.key(chat_id, user_id))
+        if not value:
+            return None
+        message_id, signature = value.split(":", 1)
+        return int(message_id), signature
@@ -0,0 +1,216 @@
+import math
+import time
+from collections.abc import Iterable, Mapping, Sequence
+
+from redis.asyncio import Redis
+
+from app import tracing
+from app.storage.cache.subscriptions import (
+    CACHE_TTL,
+    NEGATIVE_CACHE_TTL,
+    STALE_GRACE,
+    CachedStatus,
+    SubscriptionCache,
+)
+
+GENERATION = 600  # seconds
+INDEX_KEY = "subbits:users"  # user id -> bit offset
+INDEX_NEXT_KEY = "subbits:next"
+
+# KEYS: index, then per channel its negative key and generation bitmaps, newest first.
+# ARGV: user id, generations per channel.
+# Returns per channel the negative entry, the offset (0 = newest) of the newest
+# generation the user is a member in, or -1.
+READ_SCRIPT = """
+local idx = redis.call('HGET', KEYS[1], ARGV[1])
+local gens = tonumber(ARGV[2])
+local result = {}
+for c = 0, (#KEYS - 1) / (gens + 1) - 1 do
+    local base = 2 + c * (gens + 1)
+    local found = redis.call('GET', KEYS[base])
+    if not found then
+        found = -1
+        if idx then
+            for g = 1, gens do
+                if redis.call('GETBIT', KEYS[base + g], idx) == 1 then
+                    found = g - 1
+                    break
+                end
+            end
+        end
+    end
+    result[c + 1] = found
+end
+return result
+"""
+
+# KEYS: index, index counter, then per channel as in READ_SCRIPT.
+# ARGV: user id, generations per channel, expiry (unix time) of the newest
+# generation, negative TTL, then per channel "1" for a member or the negative entry.
+WRITE_SCRIPT = """
+local gens = tonumber(ARGV[2])
+local idx = redis.call('HGET', KEYS[1], ARGV[1])
+for c = 0, (#KEYS - 2) / (gens + 1) - 1 do
+    local base = 3 + c * (gens + 1)
+    local status = ARGV[5 + c]
+    if status == '1' then
+        if not idx then
+            idx = redis.call('INCR', KEYS[2]) - 1
+            redis.call('HSET', KEYS[1], ARGV[1], idx)
+        end
+        redis.call('SETBIT', KEYS[base + 1], idx, 1)
+        redis.call('EXPIREAT', KEYS[base + 1], ARGV[3])
+        redis.call('DEL', KEYS[base])
+    else
+        redis.call('SET', KEYS[base], status, 'EX', ARGV[4])
+        if idx then
+            for g = 1, gens do
+                if redis.call('EXISTS', KEYS[base + g]) == 1 then
+                    redis.call('SETBIT', KEYS[base + g], idx, 0)
+                end
+            end
+        end
+    end
+end
+"""
+
+# KEYS: index, index counter, generation bitmap. ARGV: user id, expiry (unix time).
+RESTORE_SCRIPT = """
+local idx = redis.call('HGET', KEYS[1], ARGV[1])
+if not idx then
+    idx = redis.call('INCR', KEYS[2]) - 1
+    redis.call('HSET', KEYS[1], ARGV[1], idx)
+end
+redis.call('SETBIT', KEYS[3], idx, 1)
+redis.call('EXPIREAT', KEYS[3], ARGV[2])
+"""
+
+
+class BitmapSubscriptionCache(SubscriptionCache):
+    """
+    Subscription cache with members stored as per-channel bitmaps.
+
+    Users get a dense bit offset from the `subbits:users` index. A confirmed
+    member sets their bit in the channel's bitmap of the current generation
+    (`subbits:{channel_id}:{generation}`, `generation` seconds long); lookups
+    take the newest generation with the bit set, and its start stands in for the
+    verification time. Bitmaps expire once all their entries are older than
+    `ttl + stale_grace`, so expiry costs one TTL per channel and generation
+    instead of one per pair, and members of a channel can be counted with
+    BITCOUNT. Confirmed non-members are short-lived and stay in `sub:*` keys.
+
+    The index is never trimmed: it holds every user that was ever a member.
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        ttl: int = CACHE_TTL,
+        negative_ttl: int = NEGATIVE_CACHE_TTL,
+        stale_grace: int = STALE_GRACE,
+        generation: int = GENERATION,
+    ) -> None:
+        super().__init__(redis, ttl=ttl, negative_ttl=negative_ttl, stale_grace=stale_grace)
+        self.generation = generation
+        # enough generations to cover an entry's whole lifetime
+        self.generations = math.ceil((ttl + stale_grace) / generation) + 1
+        self._read = redis.register_script(READ_SCRIPT)
+        self._write = redis.register_script(WRITE_SCRIPT)
+        self._restore = redis.register_script(RESTORE_SCRIPT)
+
+    @staticmethod
+    def bitmap_key(channel_id: int, generation: int) -> str:
+        return f"subbits:{channel_id}:{generation}"
+
+    async def get_many(self, user_id: int, channel_ids: Sequence[int]) -> dict[int, CachedStatus]:
+        if not channel_ids:
+            return {}
+
+        current = self._current_generation()
+        with tracing.span("redis.sub_get"):
+            found = await self._read(
+                keys=[INDEX_KEY, *self._channel_keys(user_id, channel_ids, current)],
+                args=[user_id, self.generations],
+            )
+
+        result: dict[int, CachedStatus] = {}
+        for cid, value in zip(channel_ids, found, strict=True):
+            if isinstance(value, str):
+                result[cid] = CachedStatus.parse(value)
+            elif value >= 0:
+                result[cid] = CachedStatus(True, (current - value) * self.generation)
+        return result
+
+    async def set_many(self, user_id: int, statuses: Mapping[int, bool]) -> None:
+        if not statuses:
+            return
+
+        current = self._current_generation()
+        negative = CachedStatus(False, time.time()).dump()
+        with tracing.span("redis.sub_set"):
+            await self._write(
+                keys=[
+                    INDEX_KEY,
+                    INDEX_NEXT_KEY,
+                    *self._channel_keys(user_id, list(statuses), current),
+                ],
+                args=[
+                    user_id,
+                    self.generations,
+                    self._expires_at(current),
+                    self.negative_ttl,
+                    *("1" if is_subscribed else negative for is_subscribed in statuses.values()),
+                ],
+            )
+
+    async def set_status(self, user_id: int, channel_id: int, is_subscribed: bool) -> None:
+        await self.set_many(user_id, {channel_id: is_subscribed})
+
+    async def restore_many(self, entries: Iterable[tuple[int, int, float]]) -> int:
+        """Sets members' bits in the generation they were verified in, if still kept."""
+        oldest = self._current_generation() - self.generations + 1
+        written = 0
+        async with self._redis.pipeline(transaction=False) as pipe:
+            for user_id, channel_id, verified_at in entries:
+                generation = int(verified_at // self.generation)
+                if generation < oldest:
+                    continue
+                await self._restore(
+                    keys=[INDEX_KEY, INDEX_NEXT_KEY, self.bitmap_key(channel_id, generation)],
+                    args=[user_id, self._expires_at(generation)],
+                    client=pipe,
+                )
+                written += 1
+            await pipe.execute()
+        return written
+
+    async def count_members(self, channel_ids: Sequence[int]) -> int:
+        """Users with a cached membership in every one of the channels."""
+        if not channel_ids:
+            return 0
+        current = self._current_generation()
+        oldest = current - self.generations + 1
+        union_keys = [f"subbits:tmp:{cid}:{time.monotonic_ns()}" for cid in channel_ids]
+        result_key = f"subbits:tmp:all:{time.monotonic_ns()}"
+        async with self._redis.pipeline(transaction=True) as pipe:
+            for cid, union_key in zip(channel_ids, union_keys, strict=True):
+                generations = [self.bitmap_key(cid, g) for g in range(oldest, current + 1)]
+                pipe.bitop("OR", union_key, *generations)
+            pipe.bitop("AND", result_key, *union_keys)
+            pipe.bitcount(result_key)
+            pipe.delete(result_key, *union_keys)
+            results = await pipe.execute()
+        return results[-2]
+
+    def _current_generation(self) -> int:
+        return int(time.time() // self.generation)
+
+    def _expires_at(self, generation: int) -> int:
+        return (generation + 1) * self.generation + self.ttl + self.stale_grace
+
+    def _channel_keys(self, user_id: int, channel_ids: Iterable[int], current: int) -> list[str]:
+        keys: list[str] = []
+        for cid in channel_ids:
+            keys.append(self.key(user_id, cid))
+            keys.extend(self.bitmap_key(cid, current - g) for g in range(self.generations))
+        return keys
@@ -0,0 +1,147 @@
+import time
+from collections.abc import Iterable, Mapping, Sequence
+from dataclasses import dataclass
+from typing import Any
+
+from redis.asyncio import Redis
+
+from app import tracing
+
+CACHE_TTL = 3600  # 1 hour, entries are also kept fresh by chat_member updates
+NEGATIVE_CACHE_TTL = 30
+STALE_GRACE = 600
+
+SUBSCRIBED = "1"
+NOT_SUBSCRIBED = "0"
+
+
+@dataclass(frozen=True, slots=True)
+class CachedStatus:
+    is_subscribed: bool
+    verified_at: float  # unix time of the last confirmation
+
+    @classmethod
+    def parse(cls, value: str) -> "CachedStatus":
+        status, _, verified_at = value.partition(":")
+        # entries written without a timestamp count as just verified
+        return cls(status == SUBSCRIBED, float(verified_at) if verified_at else time.time())
+
+    def dump(self) -> str:
+        return f"{SUBSCRIBED if self.is_subscribed else NOT_SUBSCRIBED}:{int(self.verified_at)}"
+
+
+class SubscriptionCache:
+    """
+    Batched access to cached subscription statuses.
+
+    Layout: one string key `sub:{user_id}:{channel_id}` per (user, channel) pair,
+    "1:{verified_at}" for a member and "0:{verified_at}" for a confirmed non-member
+    (short TTL). A join overwrites the negative entry in place. Positive entries are
+    considered fresh for `ttl` seconds but kept `stale_grace` seconds longer, so
+    known subscribers can be let through while they are revalidated.
+    All of a user's channels are read with a single MGET and written back with
+    a single pipeline, so a message costs one Redis round-trip per direction.
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        ttl: int = CACHE_TTL,
+        negative_ttl: int = NEGATIVE_CACHE_TTL,
+        stale_grace: int = STALE_GRACE,
+    ) -> None:
+        self._redis = redis
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.stale_grace = stale_grace
+
+    @staticmethod
+    def key(user_id: int, channel_id: int) -> str:
+        return f"sub:{user_id}:{channel_id}"
+
+    async def get_many(self, user_id: int, channel_ids: Sequence[int]) -> dict[int, CachedStatus]:
+        """
+        Returns cached statuses for the given channels.
+        Channels without a cache entry are absent from the result.
+        """
+        if not channel_ids:
+            return {}
+
+        with tracing.span("redis.sub_get"):
+            values = await self._redis.mget([self.key(user_id, cid) for cid in channel_ids])
+        return {
+            cid: CachedStatus.parse(value)
+            for cid, value in zip(channel_ids, values, strict=True)
+            if value is not None
+        }
+
+    async def set_many(self, user_id: int, statuses: Mapping[int, bool]) -> None:
+        """
+        Stores confirmed statuses in one pipelined round-trip.
+        Only pass results the Bot API actually returned: errors must not be cached.
+        """
+        if not statuses:
+            return
+
+        with tracing.span("redis.sub_set"):
+            async with self._redis.pipeline(transaction=False) as pipe:
+                for cid, is_subscribed in statuses.items():
+                    self._set(pipe, user_id, cid, is_subscribed)
+                await pipe.execute()
+
+    async def set_status(self, user_id: int, channel_id: int, is_subscribed: bool) -> None:
+        """Records a membership change observed from a chat_member update."""
+        with tracing.span("redis.sub_set"):
+            await self._set(self._redis, user_id, channel_id, is_subscribed)
+
+    async def restore_many(self, entries: Iterable[tuple[int, int, float]]) -> int:
+        """
+        Writes (user_id, channel_id, verified_at) of known members, e.g. loaded from
+        the database, with the cache lifetime they have left. Existing entries are
+        never overwritten. Returns the number of entries written.
+        """
+        now = time.time()
+        written = 0
+        async with self._redis.pipeline(transaction=False) as pipe:
+            for user_id, channel_id, verified_at in entries:
+                ttl = int(verified_at + self.ttl + self.stale_grace - now)
+                if ttl <= 0:
+                    continue
+                value = CachedStatus(True, verified_at).dump()
+                pipe.set(self.key(user_id, channel_id), value, ex=ttl, nx=True)
+                written += 1
+            await pipe.execute()
+        return written
+
+    async def count_members(self, channel_ids: Sequence[int]) -> int | None:
+        """Not available in this layout: it would take a SCAN over all `sub:*` keys."""
+        return None
+
+    @staticmethod
+    def lock_key(user_id: int, channel_id: int) -> str:
+        return f"lock:sub:{user_id}:{channel_id}"
+
+    async def acquire_locks(
+        self, user_id: int, channel_ids: Sequence[int], timeout: float
+    ) -> list[int]:
+        """
+        Tries to take the check locks for the given channels in one round-trip.
+        Returns the channels whose lock was acquired.
+        """
+        with tracing.span("redis.sub_lock"):
+            async with self._redis.pipeline(transaction=False) as pipe:
+                for cid in channel_ids:
+                    pipe.set(self.lock_key(user_id, cid), "1", nx=True, px=int(timeout * 1000))
+                acquired = await pipe.execute()
+        return [cid for cid, ok in zip(channel_ids, acquired, strict=True) if ok]
+
+    async def release_locks(self, user_id: int, channel_ids: Sequence[int]) -> None:
+        with tracing.span("redis.sub_unlock"):
+            await self._redis.delete(*(self.lock_key(user_id, cid) for cid in channel_ids))
+
+    def _set(self, client: Redis, user_id: int, channel_id: int, is_subscribed: bool) -> Any:
+        key = self.key(user_id, channel_id)
+        value = CachedStatus(is_subscribed, time.time()).dump()
+        if is_subscribed:
+            return client.setex(key, self.ttl + self.stale_grace, value)
+        return client.setex(key, self.negative_ttl, value)
@@ -0,0 +1,152 @@
+import asyncio
+import time
+import uuid
+from collections import Counter
+from collections.abc import Mapping, Sequence
+
+from redis.asyncio import Redis
+from structlog import get_logger
+
+from app import metrics, tracing
+from app.storage.cache.local import LocalTTLCache
+from app.storage.cache.subscriptions import CachedStatus, SubscriptionCache
+from app.storage.subscription_store import SubscriptionStore
+
+INVALIDATION_CHANNEL = "sub:invalidate"
+L1_MAX_ENTRIES = 100_000
+L1_TTL = 30.0
+
+logger = get_logger()
+
+
+class TieredSubscriptionCache:
+    """
+    Subscription statuses in two tiers: an in-process LRU/TTL cache (L1) in front of
+    the shared Redis cache (L2).
+
+    A message from an active user whose statuses are all in L1 costs no Redis
+    round-trip. Membership changes observed by any instance are published over
+    Redis pub/sub, and every other instance drops the affected L1 entries, so a
+    leave takes effect everywhere immediately; the short L1 TTL bounds staleness
+    if a notification is lost. Verified statuses are also handed to the durable
+    `store`, if any.
+    """
+
+    def __init__(
+        self,
+        l2: SubscriptionCache,
+        redis: Redis,
+        max_entries: int = L1_MAX_ENTRIES,
+        ttl: float = L1_TTL,
+        store: SubscriptionStore | None = None,
+    ) -> None:
+        self.l2 = l2
+        self.store = store
+        self._redis = redis
+        self._l1: LocalTTLCache[tuple[int, int], CachedStatus] = LocalTTLCache(max_entries)
+        self._l1_ttl = ttl
+        self._instance_id = uuid.uuid4().hex
+        self._listener: asyncio.Task[None] | None = None
+        self.counters: Counter[str] = Counter()
+
+    async def get_many(self, user_id: int, channel_ids: Sequence[int]) -> dict[int, CachedStatus]:
+        result: dict[int, CachedStatus] = {}
+        missing: list[int] = []
+        for cid in channel_ids:
+            status = self._l1.get((user_id, cid))
+            if status is None:
+                missing.append(cid)
+            else:
+                result[cid] = status
+
+        self.counters["l1_hits"] += len(result)
+        self.counters["l1_misses"] += len(missing)
+        metrics.SUBSCRIPTION_CACHE_LOOKUPS.labels("l1", "hit").inc(len(result))
+        metrics.SUBSCRIPTION_CACHE_LOOKUPS.labels("l1", "miss").inc(len(missing))
+        if not missing:
+            return result
+
+        found = await self.l2.get_many(user_id, missing)
+        self.counters["l2_hits"] += len(found)
+        self.counters["l2_misses"] += len(missing) - len(found)
+        metrics.SUBSCRIPTION_CACHE_LOOKUPS.labels("l2", "hit").inc(len(found))
+        metrics.SUBSCRIPTION_CACHE_LOOKUPS.labels("l2", "miss").inc(len(missing) - len(found))
+        for cid, status in found.items():
+            self._remember(user_id, cid, status)
+        return result | found
+
+    async def set_many(self, user_id: int, statuses: Mapping[int, bool]) -> None:
+        now = time.time()
+        if self.store is not None:
+            self.store.record(user_id, statuses, now)
+        await self.l2.set_many(user_id, statuses)
+        for cid, is_subscribed in statuses.items():
+            self._remember(user_id, cid, CachedStatus(is_subscribed, now))
+
+    async def set_status(self, user_id: int, channel_id: int, is_subscribed: bool) -> None:
+        """Records an observed membership change and tells other instances to drop it."""
+        now = time.time()
+        if self.store is not None:
+            self.store.record(user_id, {channel_id: is_subscribed}, now)
+        await self.l2.set_status(user_id, channel_id, is_subscribed)
+        self._remember(user_id, channel_id, CachedStatus(is_subscribed, now))
+        with tracing.span("redis.sub_publish"):
+            await self._redis.publish(
+                INVALIDATION_CHANNEL, f"{self._instance_id}:{user_id}:{channel_id}"
+            )
+
+    async def acquire_locks(
+        self, user_id: int, channel_ids: Sequence[int], timeout: float
+    ) -> list[int]:
+        return await self.l2.acquire_locks(user_id, channel_ids, timeout)
+
+    async def release_locks(self, user_id: int, channel_ids: Sequence[int]) -> None:
+        await self.l2.release_locks(user_id, channel_ids)
+
+    async def count_members(self, channel_ids: Sequence[int]) -> int | None:
+        return await self.l2.count_members(channel_ids)
+
+    def clear_local(self) -> None:
+        self._l1.clear()
+
+    def stats(self) -> dict[str, int]:
+        return {**self.counters, "l1_size": len(self._l1)}
+
+    def start(self) -> None:
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+    def _remember(self, user_id: int, channel_id: int, status: CachedStatus) -> None:
+        ttl = self._l1_ttl if status.is_subscribed else min(self._l1_ttl, self.l2.negative_ttl)
+        self._l1.set((user_id, channel_id), status, ttl)
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                async with self._redis.pubsub() as pubsub:
+                    await pubsub.subscribe(INVALIDATION_CHANNEL)
+                    async for message in pubsub.listen():
+                        if message["type"] == "message":
+                            self._invalidate(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Subscription invalidation listener failed", error=str(e))
+                # entries missed meanwhile may be stale for at most the L1 TTL
+                self.clear_local()
+                await asyncio.sleep(1)
+
+    def _invalidate(self, payload: str) -> None:
+        instance_id, user_id, channel_id = payload.split(":")
+        if instance_id != self._instance_id:
+            self._l1.pop((int(user_id), int(channel_id)))
+            self.counters["l1_invalidations"] += 1
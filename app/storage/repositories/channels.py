@@ -1,6 +1,7 @@
 from sqlalchemy import delete, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app import metrics, tracing
 from app.models.channel import Channel
 
 
@@ -27,8 +28,12 @@ class ChannelRepository:
             list[Channel]: List of all Channel objects
         """
         stmt = select(Channel)
-        result = await self._session.execute(stmt)
-        return list(result.scalars().all())
+        with (
+            metrics.DB_QUERY_SECONDS.labels("get_all_channels").time(),
+            tracing.span("db.get_all_channels"),
+        ):
+            result = await self._session.execute(stmt)
+            return list(result.scalars().all())
 
     async def upsert_channel(
         self,
@@ -37,31 +42,39 @@ class ChannelRepository:
         title: str,
         invite_link: str | None = None,
     ) -> Channel:
-        # Сначала попробуем найти существующий канал
-        stmt = select(Channel).where(Channel.telegram_id == telegram_id)
-        result = await self._session.execute(stmt)
-        channel = result.scalar_one_or_none()
+        with (
+            metrics.DB_QUERY_SECONDS.labels("upsert_channel").time(),
+            tracing.span("db.upsert_channel"),
+        ):
+            # Сначала попробуем найти существующий канал
+            stmt = select(Channel).where(Channel.telegram_id == telegram_id)
+            result = await self._session.execute(stmt)
+            channel = result.scalar_one_or_none()
 
-        if channel:
-            # Обновляем существующий канал
-            channel.title = title
-            if invite_link:
-                channel.invite_link = invite_link
-        else:
-            # Создаем новый канал
-            channel = Channel(
-                telegram_id=telegram_id,
-                title=title,
-                invite_link=invite_link,
-            )
-            self._session.add(channel)
+            if channel:
+                # Обновляем существующий канал
+                channel.title = title
+                if invite_link:
+                    channel.invite_link = invite_link
+            else:
+                # Создаем новый канал
+                channel = Channel(
+                    telegram_id=telegram_id,
+                    title=title,
+                    invite_link=invite_link,
+                )
+                self._session.add(channel)
 
-        await self._session.commit()
-        await self._session.refresh(channel)
-        return channel
+            await self._session.commit()
+            await self._session.refresh(channel)
+            return channel
 
     async def delete_channel(self, telegram_id: int) -> bool:
         stmt = delete(Channel).where(Channel.telegram_id == telegram_id)
-        result = await self._session.execute(stmt)
-        await self._session.commit()
-        return result.rowcount > 0
+        with (
+            metrics.DB_QUERY_SECONDS.labels("delete_channel").time(),
+            tracing.span("db.delete_channel"),
+        ):
+            result = await self._session.execute(stmt)
+            await self._session.commit()
+            return result.rowcount > 0
@@ -0,0 +1,64 @@
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import metrics, tracing
+from app.models.group_channel import ConfiguredGroup, GroupChannel
+
+
+class GroupChannelRepository:
+    def __init__(self, session: AsyncSession) -> None:
+        self._session = session
+
+    async def get_all_links(self) -> list[tuple[int, int]]:
+        """
+        Retrieve all group to channel links.
+
+        Returns:
+            list[tuple[int, int]]: (group_id, channel_id) pairs
+        """
+        stmt = select(GroupChannel.group_id, GroupChannel.channel_id).order_by(GroupChannel.id)
+        with (
+            metrics.DB_QUERY_SECONDS.labels("get_all_links").time(),
+            tracing.span("db.get_all_links"),
+        ):
+            result = await self._session.execute(stmt)
+            return [(row.group_id, row.channel_id) for row in result]
+
+    async def get_configured_groups(self) -> list[int]:
+        """Retrieve ids of all groups that ever had a channel linked."""
+        stmt = select(ConfiguredGroup.group_id)
+        with (
+            metrics.DB_QUERY_SECONDS.labels("get_configured_groups").time(),
+            tracing.span("db.get_configured_groups"),
+        ):
+            result = await self._session.scalars(stmt)
+            return list(result)
+
+    async def link(self, group_id: int, channel_id: int) -> bool:
+        """Requires the channel in the group. Returns False if it already was."""
+        stmt = select(GroupChannel.id).where(
+            GroupChannel.group_id == group_id, GroupChannel.channel_id == channel_id
+        )
+        with (
+            metrics.DB_QUERY_SECONDS.labels("link_channel").time(),
+            tracing.span("db.link_channel"),
+        ):
+            if await self._session.scalar(stmt) is not None:
+                return False
+            if await self._session.get(ConfiguredGroup, group_id) is None:
+                self._session.add(ConfiguredGroup(group_id=group_id))
+            self._session.add(GroupChannel(group_id=group_id, channel_id=channel_id))
+            await self._session.commit()
+            return True
+
+    async def unlink(self, group_id: int, channel_id: int) -> bool:
+        stmt = delete(GroupChannel).where(
+            GroupChannel.group_id == group_id, GroupChannel.channel_id == channel_id
+        )
+        with (
+            metrics.DB_QUERY_SECONDS.labels("unlink_channel").time(),
+            tracing.span("db.unlink_channel"),
+        ):
+            result = await self._session.execute(stmt)
+            await self._session.commit()
+            return result.rowcount > 0
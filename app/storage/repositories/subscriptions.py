@@ -0,0 +1,60 @@
+from collections.abc import AsyncIterator, Sequence
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import Row, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import metrics, tracing
+from app.models.subscription import Subscription
+
+# 4 bind parameters per row, well under the 32767 Postgres allows per statement
+UPSERT_CHUNK = 1000
+
+
+class SubscriptionRepository:
+    def __init__(self, session: AsyncSession) -> None:
+        self._session = session
+
+    async def upsert_many(self, rows: Sequence[dict[str, Any]]) -> None:
+        """
+        Stores verified statuses with multi-row upserts.
+
+        Each row has user_id, channel_id, is_subscribed and verified_at; an existing
+        row is only overwritten by a newer verification.
+        """
+        dialect = self._session.bind.dialect.name
+        insert = sqlite.insert if dialect == "sqlite" else postgresql.insert
+        with (
+            metrics.DB_QUERY_SECONDS.labels("upsert_subscriptions").time(),
+            tracing.span("db.upsert_subscriptions"),
+        ):
+            for start in range(0, len(rows), UPSERT_CHUNK):
+                stmt = insert(Subscription).values(rows[start : start + UPSERT_CHUNK])
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[Subscription.user_id, Subscription.channel_id],
+                    set_={
+                        "is_subscribed": stmt.excluded.is_subscribed,
+                        "verified_at": stmt.excluded.verified_at,
+                    },
+                    where=Subscription.verified_at < stmt.excluded.verified_at,
+                )
+                await self._session.execute(stmt)
+            await self._session.commit()
+
+    async def stream_subscribed_since(
+        self, since: datetime, batch_size: int = 5000
+    ) -> AsyncIterator[Sequence[Row[tuple[int, int, datetime]]]]:
+        """
+        Yields (user_id, channel_id, verified_at) of members verified after `since`,
+        in batches, without loading the whole table into memory.
+        """
+        stmt = (
+            select(Subscription.user_id, Subscription.channel_id, Subscription.verified_at)
+            .where(Subscription.is_subscribed, Subscription.verified_at >= since)
+            .execution_options(yield_per=batch_size)
+        )
+        result = await self._session.stream(stmt)
+        async for batch in result.partitions():
+            yield batch
@@ -0,0 +1,176 @@
+import asyncio
+import time
+from collections.abc import Callable, Mapping
+from contextlib import AbstractAsyncContextManager
+from datetime import UTC, datetime
+
+from redis.asyncio import Redis
+from sqlalchemy.ext.asyncio import AsyncSession
+from structlog import get_logger
+
+from app.storage.cache.subscriptions import SubscriptionCache
+from app.storage.repositories.subscriptions import SubscriptionRepository
+
+FILLED_KEY = "subscriptions:filled"  # present while Redis holds the cache
+REFILL_LOCK_KEY = "subscriptions:refill"
+REFILL_LOCK_TTL = 300
+
+logger = get_logger()
+
+
+class SubscriptionStore:
+    """
+    Durable copy of verified subscription statuses in Postgres.
+
+    Writes go to an in-memory write-behind buffer (the latest status per pair wins)
+    that is flushed with multi-row upserts every `flush_interval` seconds, or as
+    soon as `batch_size` pairs are pending. A marker key tells whether Redis holds
+    the cache; when it disappears (flush, failover), statuses still within their
+    cache lifetime are copied back from Postgres in bulk, instead of every active
+    user going through the Bot API again.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], AbstractAsyncContextManager[AsyncSession]],
+        redis: Redis,
+        cache: SubscriptionCache,
+        flush_interval: float = 2.0,
+        batch_size: int = 1000,
+        max_buffer: int = 100_000,
+        refill_check_interval: float = 30.0,
+    ) -> None:
+        self._session_factory = session_factory
+        self._redis = redis
+        self._cache = cache
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_buffer = max_buffer
+        self.refill_check_interval = refill_check_interval
+
+        self._buffer: dict[tuple[int, int], tuple[bool, float]] = {}
+        self._flush_now = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._tasks: list[asyncio.Task[None]] = []
+
+    @property
+    def pending(self) -> int:
+        return len(self._buffer)
+
+    def record(self, user_id: int, statuses: Mapping[int, bool], verified_at: float) -> None:
+        for channel_id, is_subscribed in statuses.items():
+            key = (user_id, channel_id)
+            self._buffer.pop(key, None)  # re-insert, so the buffer stays ordered by age
+            self._buffer[key] = (is_subscribed, verified_at)
+        self._trim()
+        if len(self._buffer) >= self.batch_size:
+            self._flush_now.set()
+
+    async def flush(self) -> None:
+        # one at a time, so a caller does not return while the loop is still
+        # writing statuses recorded before the call
+        async with self._flush_lock:
+            if not self._buffer:
+                return
+            buffer, self._buffer = self._buffer, {}
+            rows = [
+                {
+                    "user_id": user_id,
+                    "channel_id": channel_id,
+                    "is_subscribed": is_subscribed,
+                    "verified_at": _to_datetime(verified_at),
+                }
+                for (user_id, channel_id), (is_subscribed, verified_at) in buffer.items()
+            ]
+            try:
+                async with self._session_factory() as session:
+                    await SubscriptionRepository(session).upsert_many(rows)
+            except asyncio.CancelledError:
+                # stopped mid-write: keep the rows for the final flush in stop()
+                self._buffer = buffer | self._buffer
+                raise
+            except Exception as e:
+                logger.warning("Failed to store subscriptions", rows=len(rows), error=str(e))
+                # retry with the next flush; statuses recorded meanwhile are newer
+                self._buffer = buffer | self._buffer
+                self._trim()
+
+    async def refill_if_cold(self) -> int:
+        """Refills Redis from the database if it lost the cache. Returns entries restored."""
+        try:
+            if await self._redis.exists(FILLED_KEY):
+                return 0
+            if not await self._redis.set(REFILL_LOCK_KEY, "1", nx=True, ex=REFILL_LOCK_TTL):
+                return 0  # another instance is on it
+        except Exception as e:
+            logger.warning("Failed to check subscription cache state", error=str(e))
+            return 0
+
+        started = time.monotonic()
+        restored = 0
+        since = _to_datetime(time.time() - self._cache.ttl - self._cache.stale_grace)
+        try:
+            async with self._session_factory() as session:
+                repo = SubscriptionRepository(session)
+                async for batch in repo.stream_subscribed_since(since):
+                    restored += await self._cache.restore_many(
+                        (row.user_id, row.channel_id, _to_timestamp(row.verified_at))
+                        for row in batch
+                    )
+            await self._redis.set(FILLED_KEY, "1")
+        except Exception as e:
+            logger.warning("Failed to refill subscription cache", error=str(e))
+        finally:
+            try:
+                await self._redis.delete(REFILL_LOCK_KEY)
+            except Exception:
+                pass
+
+        logger.info(
+            "Subscription cache refilled from the database",
+            entries=restored,
+            duration=round(time.monotonic() - started, 3),
+        )
+        return restored
+
+    def start(self) -> None:
+        if not self._tasks:
+            self._tasks = [
+                asyncio.create_task(self._flush_loop()),
+                asyncio.create_task(self._refill_loop()),
+            ]
+
+    async def stop(self) -> None:
+        """Stops the loops and writes out whatever is still buffered."""
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self.flush()
+
+    def _trim(self) -> None:
+        # if the database is unreachable for long, drop the oldest statuses
+        while len(self._buffer) > self.max_buffer:
+            del self._buffer[next(iter(self._buffer))]
+
+    async def _flush_loop(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_now.wait(), self.flush_interval)
+            except TimeoutError:
+                pass
+            self._flush_now.clear()
+            await self.flush()
+
+    async def _refill_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.refill_check_interval)
+            await self.refill_if_cold()
+
+
+def _to_datetime(timestamp: float) -> datetime:
+    return datetime.fromtimestamp(timestamp, UTC).replace(tzinfo=None)
+
+
+def _to_timestamp(value: datetime) -> float:
+    return value.replace(tzinfo=UTC).timestamp()
@@ -0,0 +1,174 @@
+"""
+Optional per-update tracing.
+
+With TRACING_ENABLED=true, TracingMiddleware starts a Trace for every update
+and `span(name)` blocks anywhere below it (DB queries, Redis calls, Bot API
+requests, middleware stages) record how long they took. Updates slower than
+TRACING_SLOW_UPDATE are logged with all their spans, and span statistics are
+kept in a rolling TraceReport for /trace. Without an active trace, `span` is a
+no-op, so call sites never need to check whether tracing is on.
+"""
+
+import time
+from collections import deque
+from contextlib import AbstractContextManager, nullcontext
+from contextvars import ContextVar
+from typing import Any
+
+from structlog import get_logger
+
+MAX_SPANS = 200  # per update; a runaway loop must not grow a trace without bound
+
+logger = get_logger()
+
+_current: ContextVar["Trace | None"] = ContextVar("trace", default=None)
+_NOOP = nullcontext()
+
+
+class Trace:
+    __slots__ = ("update_id", "chat_id", "kind", "started", "duration", "spans", "dropped")
+
+    def __init__(self, update_id: int, chat_id: int | None, kind: str) -> None:
+        self.update_id = update_id
+        self.chat_id = chat_id
+        self.kind = kind
+        self.started = time.perf_counter()
+        self.duration: float | None = None
+        self.spans: list[tuple[str, float, float]] = []  # (name, start offset, duration)
+        self.dropped = 0
+
+    def add(self, name: str, started: float, finished: float) -> None:
+        if self.duration is not None:
+            return  # a background task outlived the update
+        if len(self.spans) >= MAX_SPANS:
+            self.dropped += 1
+            return
+        self.spans.append((name, started - self.started, finished - started))
+
+    def finish(self) -> None:
+        self.duration = time.perf_counter() - self.started
+
+
+class _Span:
+    __slots__ = ("_trace", "_name", "_started")
+
+    def __init__(self, trace: Trace, name: str) -> None:
+        self._trace = trace
+        self._name = name
+
+    def __enter__(self) -> None:
+        self._started = time.perf_counter()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self._trace.add(self._name, self._started, time.perf_counter())
+
+
+def span(name: str) -> AbstractContextManager[None]:
+    """Times the block as a span of the current update, if it is traced."""
+    trace = _current.get()
+    if trace is None:
+        return _NOOP
+    return _Span(trace, name)
+
+
+def start_trace(update_id: int, chat_id: int | None, kind: str) -> tuple[Trace, Any]:
+    """Makes a new trace current; pass the returned token to `end_trace`."""
+    trace = Trace(update_id, chat_id, kind)
+    return trace, _current.set(trace)
+
+
+def end_trace(trace: Trace, token: Any) -> None:
+    trace.finish()
+    _current.reset(token)
+
+
+class SpanStats:
+    __slots__ = ("count", "total", "max")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, duration: float) -> None:
+        self.count += 1
+        self.total += duration
+        self.max = max(self.max, duration)
+
+    def merge(self, other: "SpanStats") -> None:
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    @property
+    def avg(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+
+class TraceReport:
+    """
+    Span statistics of finished traces over the last `window` seconds.
+
+    Kept in `slices` time slices, so old data ages out in steps without storing
+    individual traces. The whole update is reported as the "update" span, and
+    updates slower than the threshold as "slow".
+    """
+
+    def __init__(self, window: float = 300.0, slices: int = 10) -> None:
+        self.window = window
+        self._slice = window / slices
+        self._slices: deque[tuple[int, dict[str, SpanStats]]] = deque(maxlen=slices)
+
+    def add(self, trace: Trace, slow: bool) -> None:
+        assert trace.duration is not None
+        slot = int(time.monotonic() // self._slice)
+        if not self._slices or self._slices[-1][0] != slot:
+            self._slices.append((slot, {}))
+        stats = self._slices[-1][1]
+
+        stats.setdefault("update", SpanStats()).add(trace.duration)
+        if slow:
+            stats.setdefault("slow", SpanStats()).add(trace.duration)
+        for name, _, duration in trace.spans:
+            stats.setdefault(name, SpanStats()).add(duration)
+
+    def summary(self) -> dict[str, SpanStats]:
+        """Merged statistics per span name, slowest total first."""
+        oldest = int(time.monotonic() // self._slice) - (self._slices.maxlen or 1) + 1
+        merged: dict[str, SpanStats] = {}
+        for slot, stats in self._slices:
+            if slot < oldest:
+                continue
+            for name, span_stats in stats.items():
+                merged.setdefault(name, SpanStats()).merge(span_stats)
+        return dict(sorted(merged.items(), key=lambda item: item[1].total, reverse=True))
+
+
+class Tracer:
+    """Collects finished traces: logs slow ones and feeds the rolling report."""
+
+    def __init__(self, slow_threshold: float = 1.0, report_window: float = 300.0) -> None:
+        self.slow_threshold = slow_threshold
+        self.report = TraceReport(report_window)
+
+    def finish(self, trace: Trace) -> None:
+        assert trace.duration is not None
+        slow = trace.duration >= self.slow_threshold
+        self.report.add(trace, slow)
+        if slow:
+            logger.warning(
+                "Slow update",
+                update_id=trace.update_id,
+                chat_id=trace.chat_id,
+                kind=trace.kind,
+                duration_ms=_ms(trace.duration),
+                spans=[
+                    {"name": name, "start_ms": _ms(start), "ms": _ms(duration)}
+                    for name, start, duration in trace.spans
+                ],
+                spans_dropped=trace.dropped,
+            )
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 2)
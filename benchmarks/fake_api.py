@@ -0,0 +1,142 @@
+import asyncio
+import random
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any
+
+from aiohttp import web
+
+OWNER_ID = 1
+
+
+@dataclass
+class FakeAPIConfig:
+    chat_member_latency: float = 0.05  # seconds per getChatMember
+    latency: float = 0.005  # seconds for every other method
+    rate_limit_rate: float = 0.0  # share of requests answered with 429
+    retry_after: int = 1
+    network_error_rate: float = 0.0  # share of requests whose connection is dropped
+    subscribed_below: int = 1_000_000  # user ids below this are channel members
+
+
+class FakeBotAPI:
+    """
+    Local stand-in for the Telegram Bot API.
+
+    Answers the methods the bot uses on the group message path, with configurable
+    latency, 429 responses and dropped connections, and counts calls per method.
+    Point a bot at it with TelegramAPIServer.from_base(server.base_url).
+    """
+
+    def __init__(self, config: FakeAPIConfig | None = None) -> None:
+        self.config = config or FakeAPIConfig()
+        self.calls: Counter[str] = Counter()
+        self.rate_limited = 0
+        self.network_errors = 0
+        self._message_id = 0
+        self._runner: web.AppRunner | None = None
+        self.base_url = ""
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> None:
+        app = web.Application()
+        app.router.add_post("/bot{token}/{method}", self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = self._runner.addresses[0][1]
+        self.base_url = f"http://{host}:{port}"
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def reset(self) -> None:
+        self.calls.clear()
+        self.rate_limited = 0
+        self.network_errors = 0
+
+    async def _handle(self, request: web.Request) -> web.StreamResponse:
+        method = request.match_info["method"]
+        params = dict(await request.post())
+        self.calls[method] += 1
+
+        config = self.config
+        delay = config.chat_member_latency if method == "getChatMember" else config.latency
+        if delay:
+            await asyncio.sleep(delay)
+
+        if random.random() < config.network_error_rate:
+            self.network_errors += 1
+            assert request.transport is not None
+            request.transport.abort()
+            return web.Response()
+
+        if random.random() < config.rate_limit_rate:
+            self.rate_limited += 1
+            return web.json_response(
+                {
+                    "ok": False,
+                    "error_code": 429,
+                    "description": f"Too Many Requests: retry after {config.retry_after}",
+                    "parameters": {"retry_after": config.retry_after},
+                },
+                status=429,
+            )
+
+        # the bot is whoever the token says, so any BOT_TOKEN works
+        bot_id = int(request.match_info["token"].split(":")[0])
+        handler = getattr(self, f"_{method}", None)
+        result = handler(bot_id, params) if handler is not None else True
+        return web.json_response({"ok": True, "result": result})
+
+    def _getChatMember(self, bot_id: int, params: dict[str, Any]) -> dict[str, Any]:
+        user_id = int(params["user_id"])
+        if user_id == bot_id:
+            return _bot_admin(bot_id)
+        status = "member" if user_id < self.config.subscribed_below else "left"
+        return {"status": status, "user": _user(user_id)}
+
+    def _getChatAdministrators(self, bot_id: int, params: dict[str, Any]) -> list[dict[str, Any]]:
+        return [
+            {"status": "creator", "user": _user(OWNER_ID), "is_anonymous": False},
+            _bot_admin(bot_id),
+        ]
+
+    def _sendMessage(self, bot_id: int, params: dict[str, Any]) -> dict[str, Any]:
+        self._message_id += 1
+        return {
+            "message_id": self._message_id,
+            "date": int(time.time()),
+            "chat": {"id": int(params["chat_id"]), "type": "supergroup", "title": "Group"},
+            "from": _user(bot_id, is_bot=True),
+            "text": params.get("text", ""),
+        }
+
+    def _getMe(self, bot_id: int, params: dict[str, Any]) -> dict[str, Any]:
+        return _user(bot_id, is_bot=True)
+
+
+def _user(user_id: int, is_bot: bool = False) -> dict[str, Any]:
+    return {"id": user_id, "is_bot": is_bot, "first_name": f"User {user_id}"}
+
+
+def _bot_admin(bot_id: int) -> dict[str, Any]:
+    return {
+        "status": "administrator",
+        "user": _user(bot_id, is_bot=True),
+        "can_be_edited": False,
+        "is_anonymous": False,
+        "can_manage_chat": True,
+        "can_delete_messages": True,
+        "can_manage_video_chats": False,
+        "can_restrict_members": True,
+        "can_promote_members": False,
+        "can_change_info": False,
+        "can_invite_users": True,
+        "can_post_stories": False,
+        "can_edit_stories": False,
+        "can_delete_stories": False,
+    }
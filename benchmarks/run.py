@@ -0,0 +1,161 @@
+"""
+Load test of the group message path.
+
+    uv sync --extra bench
+    uv run python -m benchmarks.run                      # all scenarios
+    uv run python -m benchmarks.run -s cold -s raid      # a subset
+    uv run python -m benchmarks.run --scale 5 --json out.json
+    uv run python -m benchmarks.run -s members --cache-layout bitmap
+    uv run python -m benchmarks.run -s cold_groups --api-global-rate 1000
+
+Rate limits keep their production defaults, so scenarios show what a
+single process can do within Telegram's limits.
+
+Every scenario runs in its own process against empty Redis, replays its
+traffic and reports throughput, end-to-end latency (queueing included) and Bot
+API calls per message, and the size of the subscription cache in Redis.
+"""
+
+import argparse
+import json
+import os
+from dataclasses import replace
+
+from benchmarks.fake_api import FakeAPIConfig
+from benchmarks.harness import Backends, Result, Scenario, run_isolated
+
+SCENARIOS = {
+    scenario.name: scenario
+    for scenario in (
+        Scenario("cold", "subscribed users, empty cache"),
+        Scenario(
+            "cold_groups",
+            "300 subscribed users across 100 groups requiring 5 channels, empty cache",
+            channels=5,
+            groups=100,
+            users=300,
+        ),
+        Scenario("warm", "subscribed users, every status already cached", warm=True),
+        Scenario(
+            "redis_lost",
+            "subscribed users after Redis lost the cache (refilled from the database)",
+            warm=True,
+            redis_lost=True,
+        ),
+        Scenario(
+            "raid",
+            "unsubscribed users: delete, warn, schedule warning deletion",
+            groups=50,
+            subscribed=False,
+        ),
+        Scenario(
+            "flood",
+            "unsubscribed users posting 30 messages each in their group",
+            groups=20,
+            users=20,
+            messages_per_user=30,
+            subscribed=False,
+        ),
+        Scenario("many_channels", "20 required channels, empty cache", channels=20, users=100),
+        Scenario(
+            "multi_tenant",
+            "500 registered channels, 2 linked to each of 100 groups",
+            channels=500,
+            groups=100,
+            links_per_group=2,
+        ),
+        Scenario(
+            "burst",
+            "few users posting across groups at once (single-flight checks)",
+            users=20,
+            messages_per_user=20,
+            burst=True,
+        ),
+        Scenario(
+            "members",
+            "1000 subscribed users of 8 channels, one message each (cache size)",
+            channels=8,
+            users=1000,
+            messages_per_user=1,
+        ),
+        Scenario(
+            "flaky_api",
+            "empty cache, 1% of API calls get 429 and 1% drop the connection",
+            users=100,
+            api=FakeAPIConfig(rate_limit_rate=0.01, network_error_rate=0.01),
+        ),
+    )
+}
+
+
+def scaled(scenario: Scenario, scale: float) -> Scenario:
+    return replace(scenario, users=max(1, round(scenario.users * scale)))
+
+
+def print_results(results: list[Result]) -> None:
+    header = (
+        f"{'scenario':<14}{'msgs':>7}{'msg/s':>10}{'p50 ms':>10}{'p99 ms':>10}"
+        f"{'calls/msg':>11}{'deleted':>9}{'429':>6}{'net err':>9}{'cache keys':>12}"
+        f"{'cache KB':>10}"
+    )
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(
+            f"{r.scenario:<14}{r.messages:>7}{r.throughput:>10.1f}"
+            f"{r.percentile(50) * 1000:>10.2f}{r.percentile(99) * 1000:>10.2f}"
+            f"{r.calls_per_message:>11.3f}{r.deleted:>9}{r.rate_limited:>6}{r.network_errors:>9}"
+            f"{r.cache_keys:>12}{r.cache_bytes / 1024:>10.1f}"
+        )
+    print()
+    for r in results:
+        calls = ", ".join(f"{method}={count}" for method, count in r.api_calls.most_common())
+        print(f"{r.scenario}: {calls or 'no API calls'}")
+
+
+def main(args: argparse.Namespace) -> None:
+    if args.cache_layout:
+        # read by the settings of every scenario process
+        os.environ["SUBSCRIPTION_CACHE_LAYOUT"] = args.cache_layout
+    if args.api_global_rate is not None:
+        os.environ["API_GLOBAL_RATE"] = str(args.api_global_rate)
+    backends = Backends(redis_url=args.redis_url, postgres_dsn=args.postgres_dsn)
+    results = []
+    for name in args.scenario or SCENARIOS:
+        scenario = scaled(SCENARIOS[name], args.scale)
+        if args.chat_member_latency is not None:
+            scenario = replace(
+                scenario,
+                api=replace(scenario.api, chat_member_latency=args.chat_member_latency),
+            )
+        print(f"running {name}: {scenario.description}", flush=True)
+        results.append(run_isolated(scenario, backends))
+
+    print()
+    print_results(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump([r.as_dict() for r in results], f, indent=2)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "-s", "--scenario", action="append", choices=SCENARIOS, help="may be repeated"
+    )
+    parser.add_argument("--scale", type=float, default=1.0, help="multiplies the user count")
+    parser.add_argument("--chat-member-latency", type=float, help="getChatMember latency, seconds")
+    parser.add_argument(
+        "--cache-layout", choices=("keys", "bitmap"), help="SUBSCRIPTION_CACHE_LAYOUT to use"
+    )
+    parser.add_argument(
+        "--api-global-rate", type=float, help="API_GLOBAL_RATE to use instead of the default"
+    )
+    parser.add_argument("--json", help="also write results to this file")
+    parser.add_argument("--redis-url", help="real Redis to use (the database is flushed!)")
+    parser.add_argument("--postgres-dsn", help="real Postgres to use (bot tables are wiped!)")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    main(parse_args())
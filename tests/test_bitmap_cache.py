@@ -0,0 +1,74 @@
+import time
+
+import pytest
+from fakeredis.aioredis import FakeRedis
+
+from app.storage.cache.bitmap import BitmapSubscriptionCache
+
+A, B, C = -101, -102, -103
+
+
+@pytest.fixture
+async def cache() -> BitmapSubscriptionCache:
+    return BitmapSubscriptionCache(
+        FakeRedis(decode_responses=True), ttl=3600, negative_ttl=30, stale_grace=600
+    )
+
+
+async def test_set_get_leave_count(cache: BitmapSubscriptionCache) -> None:
+    await cache.set_many(1, {A: True, B: True})
+    await cache.set_many(2, {A: True, B: False})
+    await cache.set_many(3, {A: True})
+
+    statuses = await cache.get_many(1, [A, B, C])
+    assert {cid: status.is_subscribed for cid, status in statuses.items()} == {A: True, B: True}
+    assert time.time() - statuses[A].verified_at < cache.generation
+
+    assert (await cache.get_many(2, [B]))[B].is_subscribed is False
+    assert await cache.count_members([A]) == 3
+    assert await cache.count_members([A, B]) == 1
+
+    # leaving clears the bit and caches the negative entry
+    await cache.set_status(1, B, False)
+    assert (await cache.get_many(1, [B]))[B].is_subscribed is False
+    assert await cache.count_members([A, B]) == 0
+    assert await cache.count_members([A]) == 3
+
+
+async def test_rejoin_after_leave(cache: BitmapSubscriptionCache) -> None:
+    await cache.set_status(1, A, True)
+    await cache.set_status(1, A, False)
+    await cache.set_status(1, A, True)
+    assert (await cache.get_many(1, [A]))[A].is_subscribed is True
+    assert await cache.count_members([A]) == 1
+
+
+async def test_users_get_dense_offsets(cache: BitmapSubscriptionCache) -> None:
+    for user_id in (10**12, 5, 10**9):
+        await cache.set_status(user_id, A, True)
+    await cache.set_status(5, B, True)
+
+    index = await cache._redis.hgetall("subbits:users")
+    assert sorted(index.values()) == ["0", "1", "2"]
+
+
+async def test_restore_many_skips_expired_generations(cache: BitmapSubscriptionCache) -> None:
+    now = time.time()
+    written = await cache.restore_many(
+        [
+            (1, A, now - 60),
+            (2, A, now - 3 * cache.generation),
+            (3, A, now - cache.ttl - cache.stale_grace - 2 * cache.generation),
+        ]
+    )
+    assert written == 2
+    assert set(await cache.get_many(1, [A])) == {A}
+    assert (await cache.get_many(2, [A]))[A].verified_at <= now - 2 * cache.generation
+    assert await cache.get_many(3, [A]) == {}
+
+
+async def test_empty_inputs(cache: BitmapSubscriptionCache) -> None:
+    assert await cache.get_many(1, []) == {}
+    await cache.set_many(1, {})
+    assert await cache.count_members([]) == 0
+    assert await cache.count_members([A]) == 0
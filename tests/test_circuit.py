@@ -0,0 +1,148 @@
+import asyncio
+
+import pytest
+from aiogram.exceptions import TelegramBadRequest, TelegramServerError
+from aiogram.methods import GetChatMember, SendMessage
+
+from app.bot.middlewares.request import BreakerRequestMiddleware
+from app.services import circuit
+from app.services.circuit import CircuitBreaker, CircuitState
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> FakeClock:
+    clock = FakeClock()
+    monkeypatch.setattr(circuit, "time", clock)
+    return clock
+
+
+def make_breaker() -> CircuitBreaker:
+    return CircuitBreaker("test", window=10, min_calls=4, open_duration=30.0, half_open_calls=2)
+
+
+def test_stays_closed_below_min_calls(clock: FakeClock) -> None:
+    breaker = make_breaker()
+    for _ in range(3):
+        breaker.record(False, 0.1)
+    assert breaker.state == CircuitState.CLOSED
+    assert breaker.allow_request()
+
+
+def test_trips_on_failure_rate(clock: FakeClock) -> None:
+    breaker = make_breaker()
+    for success in (True, True, False, False):
+        breaker.record(success, 0.1)
+    assert breaker.state == CircuitState.OPEN
+    assert not breaker.allow_request()
+    assert breaker.counters["rejected"] == 1
+
+
+def test_trips_on_slow_calls(clock: FakeClock) -> None:
+    breaker = make_breaker()
+    for duration in (0.1, 0.1, 5.0, 5.0):
+        breaker.record(True, duration)
+    assert breaker.is_open
+
+
+def test_trip_half_open_close(clock: FakeClock) -> None:
+    breaker = make_breaker()
+    for _ in range(4):
+        breaker.record(False, 0.1)
+    assert breaker.is_open
+
+    clock.now += 30.0
+    assert breaker.state == CircuitState.HALF_OPEN
+    # only `half_open_calls` probes get through
+    assert breaker.allow_request()
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+
+    breaker.record(True, 0.1)
+    assert breaker.state == CircuitState.HALF_OPEN
+    breaker.record(True, 0.1)
+    assert breaker.state == CircuitState.CLOSED
+    assert breaker.allow_request()
+
+    # the window was cleared on close, old failures do not count
+    breaker.record(False, 0.1)
+    assert breaker.state == CircuitState.CLOSED
+
+
+def test_failed_probe_reopens(clock: FakeClock) -> None:
+    breaker = make_breaker()
+    for _ in range(4):
+        breaker.record(False, 0.1)
+    clock.now += 30.0
+    assert breaker.allow_request()
+
+    breaker.record(False, 0.1)
+    assert breaker.is_open
+    # the open period starts over
+    clock.now += 29.0
+    assert breaker.is_open
+    clock.now += 1.0
+    assert breaker.state == CircuitState.HALF_OPEN
+
+
+def test_ignores_late_results_while_open(clock: FakeClock) -> None:
+    breaker = make_breaker()
+    for _ in range(4):
+        breaker.record(False, 0.1)
+    for _ in range(10):
+        breaker.record(True, 0.1)
+    assert breaker.is_open
+
+
+async def test_middleware_records_api_attempts() -> None:
+    breaker = make_breaker()
+    middleware = BreakerRequestMiddleware(breaker, methods=(GetChatMember,))
+    method = GetChatMember(chat_id=-100, user_id=1)
+
+    async def bad_request(bot: object, method: object) -> None:
+        raise TelegramBadRequest(method, "Bad Request: user not found")  # type: ignore[arg-type]
+
+    async def server_error(bot: object, method: object) -> None:
+        raise TelegramServerError(method, "Bad Gateway")  # type: ignore[arg-type]
+
+    # an error response means the API is up
+    for _ in range(4):
+        with pytest.raises(TelegramBadRequest):
+            await middleware(bad_request, None, method)  # type: ignore[arg-type]
+    assert breaker.state == CircuitState.CLOSED
+
+    for _ in range(4):
+        with pytest.raises(TelegramServerError):
+            await middleware(server_error, None, method)  # type: ignore[arg-type]
+    assert breaker.is_open
+
+
+async def test_middleware_ignores_cancelled_and_other_methods() -> None:
+    breaker = make_breaker()
+    middleware = BreakerRequestMiddleware(breaker, methods=(GetChatMember,))
+
+    async def hang(bot: object, method: object) -> None:
+        await asyncio.sleep(10)
+
+    async def server_error(bot: object, method: object) -> None:
+        raise TelegramServerError(method, "Bad Gateway")  # type: ignore[arg-type]
+
+    for _ in range(4):
+        task = asyncio.create_task(
+            middleware(hang, None, GetChatMember(chat_id=-100, user_id=1))  # type: ignore[arg-type]
+        )
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        with pytest.raises(TelegramServerError):
+            await middleware(server_error, None, SendMessage(chat_id=-100, text="x"))  # type: ignore[arg-type]
+    assert breaker.state == CircuitState.CLOSED
+    assert not breaker._calls
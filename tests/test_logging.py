@@ -0,0 +1,34 @@
+import pytest
+import structlog
+
+from app import logging as app_logging
+from app.logging import EventRateLimiter
+
+
+@pytest.fixture(autouse=True)
+def reset_counters() -> None:
+    app_logging.counters.clear()
+
+
+def log(limiter: EventRateLimiter, method: str = "warning") -> dict[str, object] | None:
+    try:
+        return limiter(None, method, {"event": "Raid"})
+    except structlog.DropEvent:
+        return None
+
+
+def test_drops_and_samples_over_the_limit() -> None:
+    limiter = EventRateLimiter(limit=3, window=60.0, sample_every=5)
+    written = [log(limiter) for _ in range(13)]
+
+    assert all(event is not None for event in written[:3])
+    sampled = [event for event in written[3:] if event is not None]
+    assert [event["sampled"] for event in sampled] == [5, 5]
+    assert sampled[0]["suppressed"] == 4
+    assert app_logging.counters == {"rate_limit": 8, "sampled": 2}
+
+
+def test_errors_are_never_limited() -> None:
+    limiter = EventRateLimiter(limit=1, window=60.0, sample_every=0)
+    assert all(log(limiter, "error") is not None for _ in range(10))
+    assert not app_logging.counters
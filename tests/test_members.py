@@ -0,0 +1,84 @@
+import time
+
+import pytest
+from aiogram.types import ChatMemberUpdated
+
+from app.bot.routers.members import on_channel_member_updated
+from app.services.channel_registry import ChannelRecord
+
+CHANNEL = ChannelRecord(-100, "Channel", None)
+USER = {"id": 7, "is_bot": False, "first_name": "User"}
+
+
+class FakeRegistry:
+    def get(self, telegram_id: int) -> ChannelRecord | None:
+        return CHANNEL if telegram_id == CHANNEL.telegram_id else None
+
+
+class FakeCache:
+    def __init__(self) -> None:
+        self.statuses: dict[tuple[int, int], bool] = {}
+
+    async def set_status(self, user_id: int, channel_id: int, is_subscribed: bool) -> None:
+        self.statuses[(user_id, channel_id)] = is_subscribed
+
+
+def member(status: str) -> dict[str, object]:
+    data: dict[str, object] = {"status": status, "user": USER}
+    if status == "restricted":
+        data |= {
+            "is_member": True,
+            "until_date": 0,
+            **dict.fromkeys(
+                (
+                    "can_send_messages",
+                    "can_send_audios",
+                    "can_send_documents",
+                    "can_send_photos",
+                    "can_send_videos",
+                    "can_send_video_notes",
+                    "can_send_voice_notes",
+                    "can_send_polls",
+                    "can_send_other_messages",
+                    "can_add_web_page_previews",
+                    "can_change_info",
+                    "can_invite_users",
+                    "can_pin_messages",
+                    "can_manage_topics",
+                ),
+                False,
+            ),
+        }
+    if status == "kicked":
+        data["until_date"] = 0
+    return data
+
+
+def update(old: str, new: str) -> ChatMemberUpdated:
+    return ChatMemberUpdated.model_validate(
+        {
+            "chat": {"id": CHANNEL.telegram_id, "type": "channel", "title": "Channel"},
+            "from": USER,
+            "date": int(time.time()),
+            "old_chat_member": member(old),
+            "new_chat_member": member(new),
+        }
+    )
+
+
+@pytest.mark.parametrize(
+    ("old", "new", "expected"),
+    [
+        ("left", "member", True),
+        ("member", "left", False),
+        ("member", "kicked", False),
+        # restricted users do not count, as in a get_chat_member check
+        ("left", "restricted", None),
+        ("member", "restricted", False),
+        ("restricted", "member", True),
+    ],
+)
+async def test_channel_membership_updates_cache(old: str, new: str, expected: bool | None) -> None:
+    cache = FakeCache()
+    await on_channel_member_updated(update(old, new), FakeRegistry(), cache)  # type: ignore[arg-type]
+    assert cache.statuses.get((7, CHANNEL.telegram_id)) == expected
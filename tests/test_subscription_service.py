@@ -0,0 +1,83 @@
+import asyncio
+from collections import Counter
+from types import SimpleNamespace
+
+import pytest
+from aiogram.enums import ChatMemberStatus
+from fakeredis.aioredis import FakeRedis
+
+from app.services.channel_registry import ChannelRecord
+from app.services.subscription import SubscriptionService
+from app.storage.cache.subscriptions import SubscriptionCache
+
+CHANNELS = [ChannelRecord(-100 - i, f"Channel {i}", None) for i in range(3)]
+
+
+class FakeBot:
+    """Answers getChatMember after a delay, so concurrent checks overlap."""
+
+    def __init__(self, members: set[int], delay: float = 0.05, fail: bool = False) -> None:
+        self.members = members
+        self.delay = delay
+        self.fail = fail
+        self.calls: Counter[tuple[int, int]] = Counter()
+
+    async def get_chat_member(self, chat_id: int, user_id: int) -> SimpleNamespace:
+        self.calls[(chat_id, user_id)] += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("Bad Gateway")
+        status = ChatMemberStatus.MEMBER if chat_id in self.members else ChatMemberStatus.LEFT
+        return SimpleNamespace(status=status)
+
+
+@pytest.fixture
+async def cache() -> SubscriptionCache:
+    return SubscriptionCache(FakeRedis(decode_responses=True))
+
+
+async def test_concurrent_checks_share_one_request(cache: SubscriptionCache) -> None:
+    bot = FakeBot(members={CHANNELS[0].telegram_id, CHANNELS[1].telegram_id})
+    service = SubscriptionService(cache, bot)  # type: ignore[arg-type]
+
+    results = await asyncio.gather(
+        *(service.check_user_subscription(7, CHANNELS) for _ in range(20))
+    )
+
+    assert bot.calls == Counter({(ch.telegram_id, 7): 1 for ch in CHANNELS})
+    assert all(missing == [CHANNELS[2]] for missing in results)
+
+
+async def test_later_checks_hit_the_cache(cache: SubscriptionCache) -> None:
+    bot = FakeBot(members={ch.telegram_id for ch in CHANNELS})
+    service = SubscriptionService(cache, bot)  # type: ignore[arg-type]
+
+    assert await service.check_user_subscription(7, CHANNELS) == []
+    assert await service.check_user_subscription(7, CHANNELS) == []
+    assert sum(bot.calls.values()) == len(CHANNELS)
+
+
+async def test_different_users_are_not_coalesced(cache: SubscriptionCache) -> None:
+    bot = FakeBot(members=set())
+    service = SubscriptionService(cache, bot)  # type: ignore[arg-type]
+
+    await asyncio.gather(
+        service.check_user_subscription(1, CHANNELS[:1]),
+        service.check_user_subscription(2, CHANNELS[:1]),
+    )
+    assert sum(bot.calls.values()) == 2
+
+
+async def test_failed_request_releases_waiters(cache: SubscriptionCache) -> None:
+    bot = FakeBot(members=set(), fail=True)
+    service = SubscriptionService(cache, bot, failure_policy="open")  # type: ignore[arg-type]
+
+    results = await asyncio.wait_for(
+        asyncio.gather(*(service.check_user_subscription(7, CHANNELS) for _ in range(5))), 1.0
+    )
+
+    assert bot.calls == Counter({(ch.telegram_id, 7): 1 for ch in CHANNELS})
+    # failures are not cached and, under the open policy, let the message through
+    assert results == [[]] * 5
+    assert service.counters["failed_open"] == 5 * len(CHANNELS)
+    assert not service._inflight
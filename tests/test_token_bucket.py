@@ -0,0 +1,83 @@
+import asyncio
+import time
+
+from aiogram.methods import GetChatMember, SendMessage
+
+from app.bot.middlewares.request import Priority, RateLimitRequestMiddleware, TokenBucket
+
+
+async def test_takes_available_tokens_immediately() -> None:
+    bucket = TokenBucket(rate=1.0, capacity=3)
+    started = time.monotonic()
+    for _ in range(3):
+        await bucket.acquire()
+    assert time.monotonic() - started < 0.05
+    assert not bucket.idle
+
+
+async def test_high_priority_overtakes_queued_low_priority() -> None:
+    bucket = TokenBucket(rate=50.0, capacity=1)
+    await bucket.acquire()  # empty the bucket, so everyone below has to queue
+
+    served: list[str] = []
+
+    async def acquire(name: str, priority: Priority) -> None:
+        await bucket.acquire(priority)
+        served.append(name)
+
+    low = [asyncio.create_task(acquire(f"low{i}", Priority.LOW)) for i in range(3)]
+    await asyncio.sleep(0)
+    high = asyncio.create_task(acquire("high", Priority.HIGH))
+    await asyncio.gather(*low, high)
+
+    assert served == ["high", "low0", "low1", "low2"]
+
+
+async def test_cancelled_waiter_does_not_take_a_token() -> None:
+    bucket = TokenBucket(rate=20.0, capacity=1)
+    await bucket.acquire()
+
+    cancelled = asyncio.create_task(bucket.acquire(Priority.HIGH))
+    waiting = asyncio.create_task(bucket.acquire(Priority.LOW))
+    await asyncio.sleep(0)
+    cancelled.cancel()
+
+    started = time.monotonic()
+    await waiting
+    # served with the first refilled token instead of the second
+    assert time.monotonic() - started < 0.09
+
+
+async def test_pause_blocks_until_retry_after() -> None:
+    bucket = TokenBucket(rate=100.0, capacity=100)
+    bucket.pause(0.1)
+    started = time.monotonic()
+    await bucket.acquire()
+    assert time.monotonic() - started >= 0.1
+
+
+async def test_refills_from_empty_after_pause() -> None:
+    bucket = TokenBucket(rate=50.0, capacity=50)
+    bucket.pause(0.05)
+    await asyncio.sleep(0.06)
+
+    started = time.monotonic()
+    await asyncio.gather(*(bucket.acquire() for _ in range(5)))
+    # the paused time is not credited: 5 tokens take ~0.1 s to refill, not a burst
+    assert time.monotonic() - started >= 0.05
+
+
+async def test_reads_bypass_the_global_bucket() -> None:
+    middleware = RateLimitRequestMiddleware(global_rate=1.0, read_rate=0.0)
+    sent: list[str] = []
+
+    async def make_request(bot: object, method: object) -> None:
+        sent.append(type(method).__name__)
+
+    await middleware(make_request, None, SendMessage(chat_id=1, text="x"))  # type: ignore[arg-type]
+    # the global bucket is empty now, reads still go straight through
+    started = time.monotonic()
+    for user_id in range(10):
+        await middleware(make_request, None, GetChatMember(chat_id=-100, user_id=user_id))  # type: ignore[arg-type]
+    assert time.monotonic() - started < 0.05
+    assert sent == ["SendMessage"] + ["GetChatMember"] * 10